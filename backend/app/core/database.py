@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import get_settings
+from app.core.metrics import instrument_engine
 
 import os
 
@@ -21,6 +24,29 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers for the same database
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+def async_database_url(url: str) -> str:
+    """postgresql://... -> postgresql+asyncpg://..., sqlite:///... -> sqlite+aiosqlite:///..."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend in _ASYNC_DRIVERS:
+        parsed = parsed.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}")
+    return parsed.render_as_string(hide_password=False)
+
+# Used by the hot endpoints and the campaign worker, which run on the event
+# loop and must not block it; the rest of the app keeps the sync engine.
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    pool_pre_ping=True
+)
+# expire_on_commit=False: objects returned from a handler are read after its commit
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
 Base = declarative_base()
 
 def get_db():
@@ -29,3 +55,30 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def init_db():
+    """
+    Creates missing tables. There is no migration tool in this project, so
+    indexes and nullable columns added to tables that already exist are
+    created here as well.
+    """
+    import app.models  # noqa: F401 -- registers every model on Base.metadata
+
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+    for table in Base.metadata.sorted_tables:
+        indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(bind=engine)
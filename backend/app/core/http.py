@@ -0,0 +1,44 @@
+import httpx
+from typing import Optional
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def create_http_client(base_url: str, timeout: float, http2: bool = False, headers: Optional[dict] = None) -> httpx.AsyncClient:
+    """
+    Builds a pooled AsyncClient for one upstream. Meant to live for the whole
+    app (see the lifespan in app/main.py) so connections are kept alive
+    between calls instead of paying a TCP/TLS handshake on every request.
+    """
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        http2=http2,
+        timeout=httpx.Timeout(timeout, connect=settings.HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def create_evolution_client() -> httpx.AsyncClient:
+    return create_http_client(
+        base_url=settings.EVOLUTION_API_URL,
+        timeout=settings.EVOLUTION_HTTP_TIMEOUT,
+        http2=settings.EVOLUTION_HTTP2,
+        headers={
+            "apikey": settings.EVOLUTION_API_KEY,
+            "Content-Type": "application/json"
+        },
+    )
+
+
+def create_apify_client() -> httpx.AsyncClient:
+    return create_http_client(
+        base_url=settings.APIFY_API_URL,
+        timeout=settings.APIFY_HTTP_TIMEOUT,
+        http2=settings.APIFY_HTTP2,
+    )
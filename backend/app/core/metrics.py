@@ -0,0 +1,239 @@
+"""
+Prometheus metrics.
+
+prometheus_client is optional: when it is not installed, or METRICS_ENABLED
+is off, every metric below is a shared no-op object, the HTTP middleware
+and database hooks are not installed and services are left unwrapped, so
+the hot paths pay at most one no-op method call.
+"""
+import functools
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import get_settings
+
+try:
+    import prometheus_client
+except ImportError:  # optional dependency
+    prometheus_client = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = settings.METRICS_ENABLED and prometheus_client is not None
+
+# Latency buckets in seconds: local DB calls up to slow upstream calls
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+_SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_RUN_BUCKETS = (5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+_NOOP = _NoopMetric()
+
+
+def _histogram(name, documentation, labels, buckets):
+    if not METRICS_ENABLED:
+        return _NOOP
+    return prometheus_client.Histogram(name, documentation, labels, buckets=buckets)
+
+
+def _counter(name, documentation, labels):
+    return prometheus_client.Counter(name, documentation, labels) if METRICS_ENABLED else _NOOP
+
+
+def _gauge(name, documentation, labels=()):
+    return prometheus_client.Gauge(name, documentation, labels) if METRICS_ENABLED else _NOOP
+
+
+HTTP_REQUEST_SECONDS = _histogram(
+    "montandon_http_request_seconds", "API request latency until the response starts", ["method", "route", "status"], _FAST_BUCKETS
+)
+DB_QUERY_SECONDS = _histogram(
+    "montandon_db_query_seconds", "SQL statement duration", ["engine", "kind"], _FAST_BUCKETS
+)
+EVOLUTION_SEND_SECONDS = _histogram(
+    "montandon_evolution_send_seconds", "Evolution sendText latency by result (OK or error code)", ["instance", "status"], _SLOW_BUCKETS
+)
+EVOLUTION_REQUEST_SECONDS = _histogram(
+    "montandon_evolution_request_seconds", "Other Evolution API calls", ["operation", "outcome"], _SLOW_BUCKETS
+)
+APIFY_REQUEST_SECONDS = _histogram(
+    "montandon_apify_request_seconds", "Apify API calls", ["operation", "outcome"], _SLOW_BUCKETS
+)
+APIFY_RUN_SECONDS = _histogram(
+    "montandon_apify_run_seconds", "Apify actor runs, from start until their dataset was read", ["outcome"], _RUN_BUCKETS
+)
+CAMPAIGN_MESSAGES = _counter(
+    "montandon_campaign_messages_total", "Campaign recipients processed, by final status", ["status"]
+)
+EVOLUTION_SENDS_IN_FLIGHT = _gauge(
+    "montandon_evolution_sends_in_flight", "Sends waiting on the Evolution API right now"
+)
+WEBHOOK_EVENTS = _counter(
+    "montandon_webhook_events_total", "Evolution webhook events by outcome (queued, ignored, dropped, unmatched)", ["event", "outcome"]
+)
+CAMPAIGN_QUEUE_DEPTH = _gauge(
+    "montandon_campaign_queue_depth", "Campaign recipients by queue status (refreshed on scrape)", ["status"]
+)
+
+
+def _statement_kind(statement: str) -> str:
+    return statement.lstrip().split(" ", 1)[0].upper()
+
+
+def instrument_engine(engine, name: str):
+    """Times every statement through cursor events. No-op when metrics are off."""
+    if not METRICS_ENABLED:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            DB_QUERY_SECONDS.labels(name, _statement_kind(statement)).observe(time.perf_counter() - started)
+
+
+def _wrap(method: Callable, observe: Callable[[Any, Optional[BaseException], float], None]):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = await method(*args, **kwargs)
+        except BaseException as e:
+            observe(None, e, time.perf_counter() - started)
+            raise
+        observe(result, None, time.perf_counter() - started)
+        return result
+    return wrapper
+
+
+def _wrap_stream(method: Callable, histogram):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started, outcome = time.perf_counter(), "error"
+        try:
+            async for item in method(*args, **kwargs):
+                yield item
+            outcome = "ok"
+        except GeneratorExit:
+            outcome = "closed" # the consumer stopped reading
+            raise
+        finally:
+            histogram.labels(outcome).observe(time.perf_counter() - started)
+    return wrapper
+
+
+def _outcome_observer(histogram, operation: str):
+    def observe(result, error, seconds):
+        histogram.labels(operation, "error" if error else "ok").observe(seconds)
+    return observe
+
+
+def instrument_evolution_service(service):
+    """Wraps the instance's outbound calls with timers. Returns the service."""
+    if not METRICS_ENABLED:
+        return service
+    send_text = service.send_text
+
+    async def timed_send_text(*args, **kwargs):
+        started = time.perf_counter()
+        EVOLUTION_SENDS_IN_FLIGHT.inc()
+        try:
+            result = await send_text(*args, **kwargs)
+        finally:
+            EVOLUTION_SENDS_IN_FLIGHT.dec()
+        status = "OK" if result.success else result.error_code
+        instance = kwargs.get("instance") or settings.evolution_instances[0]
+        EVOLUTION_SEND_SECONDS.labels(instance, status).observe(time.perf_counter() - started)
+        return result
+
+    service.send_text = functools.wraps(send_text)(timed_send_text)
+    for operation in ("check_whatsapp_numbers", "get_instance_status"):
+        setattr(service, operation, _wrap(getattr(service, operation), _outcome_observer(EVOLUTION_REQUEST_SECONDS, operation)))
+    return service
+
+
+def instrument_apify_service(service):
+    """Wraps the instance's Apify calls with timers. Returns the service."""
+    if not METRICS_ENABLED:
+        return service
+    for operation in ("start_run", "get_run", "abort_run", "get_dataset_page"):
+        setattr(service, operation, _wrap(getattr(service, operation), _outcome_observer(APIFY_REQUEST_SECONDS, operation)))
+    service.iter_run_items = _wrap_stream(service.iter_run_items, APIFY_RUN_SECONDS)
+    return service
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (safe with streaming responses): observes the time
+    until the response starts, labelled with the route template rather than
+    the raw path so ids do not explode the label space.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[Any, str] = {}
+
+    def _route_label(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if endpoint not in self._routes:
+            router = scope.get("router")
+            path = next((r.path for r in getattr(router, "routes", []) if getattr(r, "endpoint", None) is endpoint), None)
+            self._routes[endpoint] = path or endpoint.__name__
+        return self._routes[endpoint]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                HTTP_REQUEST_SECONDS.labels(scope["method"], self._route_label(scope), str(message["status"])).observe(
+                    time.perf_counter() - started
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def start_worker_metrics_server():
+    """The worker has no HTTP API; it exposes its own metrics on METRICS_WORKER_PORT."""
+    if METRICS_ENABLED and settings.METRICS_WORKER_PORT:
+        try:
+            prometheus_client.start_http_server(settings.METRICS_WORKER_PORT)
+            logger.info(f"Worker metrics on :{settings.METRICS_WORKER_PORT}/metrics")
+        except OSError as e:
+            # e.g. a second worker on the same host
+            logger.warning(f"Worker metrics server not started on port {settings.METRICS_WORKER_PORT}: {e}")
+
+
+def render_latest():
+    """(body, content type) of the current metrics, for the /metrics route."""
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
@@ -1,18 +1,51 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import func, select
 from app.core.config import get_settings
-from app.core.database import engine, Base
-from app.routes import search, contacts, templates, campaigns
+from app.core.database import SessionLocal, async_engine, init_db
+from app.core.metrics import METRICS_ENABLED, CAMPAIGN_QUEUE_DEPTH, MetricsMiddleware, render_latest
+from app.models.all_models import CampaignRecipient, RecipientStatus
+from app.core.http import create_evolution_client, create_apify_client
+from app.routes import search, contacts, templates, segments, campaigns, webhooks
+from app.services.evolution_service import evolution_service
+from app.services.apify_service import apify_service
+from app.services.evolution_webhooks import webhook_buffer
+from app.worker import CampaignWorker
 
 # Create tables
-Base.metadata.create_all(bind=engine)
+init_db()
 
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client per upstream, shared by every request
+    evolution_service.bind_client(create_evolution_client())
+    apify_service.bind_client(create_apify_client())
+    webhook_buffer.start()
+
+    worker_task = None
+    if settings.CAMPAIGN_WORKER_EMBEDDED:
+        worker = CampaignWorker()
+        worker_task = asyncio.create_task(worker.run())
+
+    yield
+
+    if worker_task:
+        worker.stop()
+        await worker_task
+    await webhook_buffer.close()
+    await evolution_service.aclose()
+    await apify_service.aclose()
+    await async_engine.dispose()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # CORS
@@ -27,14 +60,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Routes
 app.include_router(search.router, prefix="/api/v1/search", tags=["Search"])
 app.include_router(contacts.router, prefix="/api/v1/contacts", tags=["Contacts"])
 app.include_router(templates.router, prefix="/api/v1/templates", tags=["Templates"])
+app.include_router(segments.router, prefix="/api/v1/segments", tags=["Segments"])
 app.include_router(campaigns.router, prefix="/api/v1/campaigns", tags=["Campaigns"])
+app.include_router(webhooks.router, prefix="/api/v1/webhooks", tags=["Webhooks"])
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        # Queue depth is read at scrape time, so it is right whichever process sends
+        db = SessionLocal()
+        try:
+            depth = dict(db.execute(
+                select(CampaignRecipient.status, func.count(CampaignRecipient.id)).group_by(CampaignRecipient.status)
+            ).all())
+        finally:
+            db.close()
+        for status in RecipientStatus:
+            CAMPAIGN_QUEUE_DEPTH.labels(status.value).set(depth.get(status.value, 0))
+
+        body, content_type = render_latest()
+        return Response(content=body, media_type=content_type)
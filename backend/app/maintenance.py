@@ -0,0 +1,53 @@
+"""
+Database maintenance.
+
+    python -m app.maintenance              # one pass (cron, Task Scheduler)
+    python -m app.maintenance --interval 86400   # keeps running, one pass a day
+
+Each pass rolls up, archives and deletes campaign logs older than
+LOG_RETENTION_DAYS (see services/log_retention).
+"""
+import argparse
+import logging
+import signal
+import threading
+
+from app.core.database import SessionLocal, init_db
+from app.services.log_retention import apply_log_retention
+
+logger = logging.getLogger(__name__)
+
+
+def run_once():
+    db = SessionLocal()
+    try:
+        return apply_log_retention(db)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Campaign log retention")
+    parser.add_argument("--interval", type=float, default=0, help="seconds between passes (default: run once and exit)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    init_db()
+    if not args.interval:
+        run_once()
+        return
+
+    stopping = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopping.set())
+    while not stopping.is_set():
+        try:
+            run_once()
+        except Exception as e:
+            # Next pass retries; nothing is deleted before its rollup is committed
+            logger.error(f"Maintenance pass failed: {e}")
+        stopping.wait(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1 @@
-from app.models.all_models import Contact, Template, Campaign, CampaignLog, ContactStatus
+from app.models.all_models import Contact, Template, Segment, Campaign, CampaignLog, CampaignLogDaily, CampaignRecipient, SearchCacheEntry, WhatsAppNumberCheck, ContactStatus, RecipientStatus, DeliveryStatus
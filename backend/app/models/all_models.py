@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum as SqEnum
+from sqlalchemy import Column, Boolean, Integer, String, Text, Date, DateTime, ForeignKey, UniqueConstraint, Index, Enum as SqEnum
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -9,19 +9,48 @@ class ContactStatus(str, enum.Enum):
     SENT = "SENT"
     ERROR = "ERROR"
     ARCHIVED = "ARCHIVED"
+    REPLIED = "REPLIED" # answered a campaign message (Evolution webhook)
+
+class RecipientStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    IN_PROGRESS = "IN_PROGRESS"
+    SENT = "SENT"
+    ERROR = "ERROR"
+    SKIPPED = "SKIPPED"
+
+class DeliveryStatus(str, enum.Enum):
+    """WhatsApp receipts reported by Evolution's messages.update webhook, in order."""
+    SERVER_ACK = "SERVER_ACK"
+    DELIVERY_ACK = "DELIVERY_ACK"
+    READ = "READ"
+    PLAYED = "PLAYED"
 
 class Contact(Base):
     __tablename__ = "contacts"
+    __table_args__ = (
+        # Keyset pagination on id (newest first) filtered by status/category,
+        # plus created_at range scans for segments and exports
+        Index("ix_contacts_status_id", "status", "id"),
+        Index("ix_contacts_category_id", "category", "id"),
+        Index("ix_contacts_created_at_id", "created_at", "id"),
+        # Business-level dedupe (see utils/dedupe): same place under another phone
+        Index("ix_contacts_place_id", "place_id"),
+        Index("ix_contacts_dedupe_key", "dedupe_key"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     phone = Column(String, unique=True, index=True)
+    phone_type = Column(String, nullable=True, index=True) # MOBILE, LANDLINE, INVALID (see utils/phone_normalizer)
     address = Column(String, nullable=True)
     category = Column(String, nullable=True)
     google_maps_link = Column(String, nullable=True)
+    place_id = Column(String, nullable=True) # Maps place id (or "cid:<n>") parsed from google_maps_link
+    dedupe_key = Column(String, nullable=True) # hash of normalized name + address
     
     # Can be used to track if this contact was ever contacted successfully
     status = Column(String, default=ContactStatus.PENDING) 
+    replied_at = Column(DateTime(timezone=True), nullable=True) # last reply received on WhatsApp
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -34,27 +63,140 @@ class Template(Base):
     content = Column(Text) # Supports {nome}, {cidade} etc
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class Segment(Base):
+    """
+    Saved contact filter. Campaigns created from a segment get their
+    recipients with one INSERT ... SELECT (see services/segments), so the
+    contact ids never travel through the API. Unset filters match everyone.
+    """
+    __tablename__ = "segments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+    status = Column(String, nullable=True) # contact status
+    category = Column(String, nullable=True)
+    created_after = Column(DateTime(timezone=True), nullable=True)
+    created_before = Column(DateTime(timezone=True), nullable=True)
+    # Contacts already sent a message (recipient SENT) in that campaign, or never sent one there
+    messaged_in_campaign_id = Column(Integer, nullable=True)
+    not_messaged_in_campaign_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class Campaign(Base):
     __tablename__ = "campaigns"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     template_id = Column(Integer, ForeignKey("templates.id"))
-    status = Column(String, default="DRAFT") # DRAFT, RUNNING, COMPLETED
+    status = Column(String, default="DRAFT") # SCHEDULED, QUEUED, RUNNING, PAUSED, PAUSED_DISCONNECTED, COMPLETED
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Scheduling (see services/campaign_queue): not sent before scheduled_at
+    # (UTC), only inside send_window ("HH:MM-HH:MM" in CAMPAIGN_TIMEZONE, or
+    # the CAMPAIGN_SEND_WINDOW default), sharing the send rate by weight
+    scheduled_at = Column(DateTime(timezone=True), nullable=True)
+    send_window = Column(String, nullable=True)
+    weight = Column(Integer, nullable=True) # NULL counts as 1
+    segment_id = Column(Integer, ForeignKey("segments.id"), nullable=True) # when targeted by segment
     
     template = relationship("Template")
     logs = relationship("CampaignLog", back_populates="campaign")
 
 class CampaignLog(Base):
     __tablename__ = "campaign_logs"
+    __table_args__ = (
+        # Per-campaign listing (keyset on id) and send-rate windows on sent_at
+        Index("ix_campaign_logs_campaign_id_id", "campaign_id", "id"),
+        Index("ix_campaign_logs_campaign_sent_at", "campaign_id", "sent_at"),
+        Index("ix_campaign_logs_status_id", "status", "id"),
+        # Webhook matching: receipts by message id, replies by contact (latest log)
+        Index("ix_campaign_logs_message_id", "message_id"),
+        Index("ix_campaign_logs_contact_id_id", "contact_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     campaign_id = Column(Integer, ForeignKey("campaigns.id"))
     contact_id = Column(Integer, ForeignKey("contacts.id"))
-    status = Column(String) # SENT, ERROR
+    status = Column(String) # SENT, ERROR, SKIPPED
     error_message = Column(Text, nullable=True)
     sent_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Filled in by the Evolution webhooks (services/evolution_webhooks)
+    message_id = Column(String, nullable=True) # WhatsApp key.id returned by sendText
+    delivery_status = Column(String, nullable=True) # DeliveryStatus, only moves forward
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+    read_at = Column(DateTime(timezone=True), nullable=True)
+    replied_at = Column(DateTime(timezone=True), nullable=True)
+
     campaign = relationship("Campaign", back_populates="logs")
     contact = relationship("Contact")
+
+class CampaignLogDaily(Base):
+    """
+    Per campaign, UTC day and status rollup of campaign_logs rows that the
+    retention job (python -m app.maintenance) archived and deleted. Stats
+    read these plus whatever raw logs are still there.
+    """
+    __tablename__ = "campaign_log_daily"
+    __table_args__ = (
+        UniqueConstraint("campaign_id", "day", "status", name="uq_campaign_log_daily_campaign_day_status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    status = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    first_sent_at = Column(DateTime(timezone=True), nullable=True)
+    last_sent_at = Column(DateTime(timezone=True), nullable=True)
+    # Webhook receipts of the archived logs (NULL on rollups written before these existed)
+    delivered = Column(Integer, nullable=True, default=0)
+    read = Column(Integer, nullable=True, default=0)
+    replied = Column(Integer, nullable=True, default=0)
+
+class CampaignRecipient(Base):
+    """
+    One row per campaign/contact pair. This is the durable dispatch queue:
+    workers claim PENDING rows (or IN_PROGRESS rows whose lease expired),
+    so a campaign survives restarts without double-sending.
+    """
+    __tablename__ = "campaign_recipients"
+    __table_args__ = (
+        UniqueConstraint("campaign_id", "contact_id", name="uq_campaign_recipients_campaign_contact"),
+        Index("ix_campaign_recipients_status_campaign", "status", "campaign_id", "id"),
+        Index("ix_campaign_recipients_contact_id", "contact_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), nullable=False)
+    contact_id = Column(Integer, ForeignKey("contacts.id"), nullable=False)
+    status = Column(String, default=RecipientStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+
+    # Lease held by the worker currently processing this row
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class SearchCacheEntry(Base):
+    """Normalized contacts of one expanded Apify query ("term in location") for a given limit."""
+    __tablename__ = "search_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String, unique=True, index=True) # "<limit>:<query lowercased>"
+    query = Column(String)
+    result_limit = Column(Integer)
+    items = Column(Text) # JSON list of ContactCreate dicts
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    last_accessed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class WhatsAppNumberCheck(Base):
+    """Last answer of Evolution's "check whatsapp numbers" endpoint for a phone."""
+    __tablename__ = "whatsapp_number_checks"
+
+    phone = Column(String, primary_key=True) # normalized, as stored in contacts.phone
+    on_whatsapp = Column(Boolean, nullable=False)
+    jid = Column(String, nullable=True) # e.g. "5519999999999@s.whatsapp.net"
+    checked_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,134 +1,208 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+from typing import List, Optional
+import json
 import logging
-import asyncio
 
-from app.core.database import get_db
-from app.models.all_models import Campaign, CampaignLog, Contact, Template, ContactStatus
-from app.schemas.all_schemas import CampaignCreate, CampaignRead
-from app.services.evolution_service import evolution_service
+from app.core.database import get_async_db
+from app.models.all_models import Campaign, CampaignLog, Contact, Segment, Template
+from app.schemas.all_schemas import CampaignCreate, CampaignRead, CampaignLogRead, CampaignStats, CampaignDailyStats
+from app.services.campaign_queue import PAUSED, SCHEDULED, enqueue_recipients, pause_campaign, resume_campaign
+from app.services.campaign_events import campaign_events, progress_relay, FINISHED_CAMPAIGN_STATUSES
+from app.services.campaign_stats import compute_campaign_stats, compute_daily_stats
+from app.services.segments import enqueue_segment
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.projection import parse_fields, rows_response
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-async def run_campaign_background(campaign_id: int, contact_ids: List[int], db_session_factory):
-    """
-    Background task to process campaign.
-    We use a fresh session because the passed one might be closed.
-    """
-    db = db_session_factory()
-    try:
-        campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
-        if not campaign:
-            return
-
-        template = campaign.template
-        contacts = db.query(Contact).filter(Contact.id.in_(contact_ids)).all()
-
-        campaign.status = "RUNNING"
-        db.commit()
-
-        for contact in contacts:
-            # Format message
-            message = template.content.format(
-                nome=contact.name or "",
-                cidade=contact.address or "", # Simplified
-                categoria=contact.category or ""
-            )
-
-            # Send
-            success = await evolution_service.send_text(
-                phone=contact.phone,
-                message=message
-            )
-
-            # Log
-            log = CampaignLog(
-                campaign_id=campaign.id,
-                contact_id=contact.id,
-                status="SENT" if success else "ERROR",
-                error_message=None if success else "Failed to send via Evolution API"
-            )
-            db.add(log)
-            
-            # Update Contact Status
-            contact.status = ContactStatus.SENT if success else ContactStatus.ERROR
-            db.commit()
-            
-            # Wait a bit to avoid ban
-            await asyncio.sleep(5) 
-
-        campaign.status = "COMPLETED"
-        db.commit()
-
-    except Exception as e:
-        logger.error(f"Campaign failed: {e}")
-        if campaign:
-            campaign.status = "ERROR"
-            db.commit()
-    finally:
-        db.close()
+# Campaign routes are polled while campaigns run, so they use the async
+# session and stay on the event loop instead of the threadpool.
 
 @router.post("/", response_model=CampaignRead)
-def create_campaign(
-    campaign_in: CampaignCreate, 
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-):
+async def create_campaign(campaign_in: CampaignCreate, db: AsyncSession = Depends(get_async_db)):
     # 1. Verify template
-    template = db.query(Template).filter(Template.id == campaign_in.template_id).first()
+    template = await db.get(Template, campaign_in.template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
-
-    # 2. Create Campaign Record
+    segment = None
+    if campaign_in.segment_id is not None:
+        segment = await db.get(Segment, campaign_in.segment_id)
+        if not segment:
+            raise HTTPException(status_code=404, detail="Segment not found")
+
+    # 2. Create Campaign Record. A future scheduled_at keeps it SCHEDULED
+    # until then; the worker only claims inside the campaign's send window.
+    scheduled_at = campaign_in.scheduled_at
+    scheduled = scheduled_at is not None and scheduled_at > datetime.now(timezone.utc)
     db_campaign = Campaign(
         name=campaign_in.name,
         template_id=campaign_in.template_id,
-        status="QUEUED"
+        status=SCHEDULED if scheduled else "QUEUED",
+        scheduled_at=scheduled_at,
+        send_window=campaign_in.send_window,
+        weight=campaign_in.weight,
+        segment_id=campaign_in.segment_id
     )
     db.add(db_campaign)
-    db.commit()
-    db.refresh(db_campaign)
-
-    # 3. Launch Background Task
-    # We pass the session factory (SessionLocal) to the background task
-    from app.core.database import SessionLocal
-    background_tasks.add_task(
-        run_campaign_background, 
-        db_campaign.id, 
-        campaign_in.contact_ids, 
-        SessionLocal
-    )
+    await db.flush()
+
+    # 3. Queue recipients in the same transaction.
+    # Sending is done by the campaign worker (python -m app.worker), not by the API process.
+    if segment is not None:
+        # Resolved in SQL: the contact ids never leave the database
+        queued = await enqueue_segment(db, db_campaign.id, segment)
+        await db.commit()
+        logger.info(f"Campaign {db_campaign.id} queued with {queued} recipients from segment {segment.id}")
+    else:
+        queued = await enqueue_recipients(db, db_campaign.id, campaign_in.contact_ids)
+        await db.commit()
+        logger.info(f"Campaign {db_campaign.id} queued with {queued} recipients ({len(campaign_in.contact_ids) - queued} unknown, duplicated or not sendable)")
+    await db.refresh(db_campaign)
 
     return db_campaign
 
+# Fields of CampaignRead / CampaignLogRead, in order, for `?fields=`
+CAMPAIGN_FIELDS = ("id", "name", "template_id", "status", "created_at", "scheduled_at", "send_window", "weight", "segment_id")
+LOG_COLUMNS = (
+    "id", "campaign_id", "status", "sent_at", "error_message",
+    "delivery_status", "delivered_at", "read_at", "replied_at",
+)
+LOG_FIELDS = LOG_COLUMNS + ("campaign_name", "contact_name")
+
 @router.get("/", response_model=List[CampaignRead])
-def list_campaigns(db: Session = Depends(get_db)):
-    return db.query(Campaign).all()
-
-@router.get("/logs")
-def list_logs(db: Session = Depends(get_db)):
-    # Simple join to get strings would be better, but for now returning raw logs
-    # ideally we return a schema with campaign_name and contact_name
-    logs = db.query(
-        CampaignLog.id, 
-        CampaignLog.status, 
-        CampaignLog.sent_at, 
-        CampaignLog.error_message, 
-        Campaign.name.label("campaign_name"), 
-        Contact.name.label("contact_name")
-    ).join(Campaign).join(Contact).order_by(CampaignLog.sent_at.desc()).all()
-    
-    # transform to list of dicts for JSON
-    return [
-        {
-            "id": log.id,
-            "status": log.status,
-            "sent_at": log.sent_at,
-            "error_message": log.error_message,
-            "campaign_name": log.campaign_name,
-            "contact_name": log.contact_name
-        } 
-        for log in logs
-    ]
+async def list_campaigns(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields, e.g. id,name,status"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Campaigns, newest first. Pass X-Next-Cursor back as `cursor` for the next page.
+    Column projection serialized with orjson, like GET /contacts.
+    """
+    selected = parse_fields(fields, CAMPAIGN_FIELDS)
+    columns = set(selected) | {"id"}
+    query = select(*[getattr(Campaign, name) for name in CAMPAIGN_FIELDS if name in columns])
+    if status:
+        query = query.where(Campaign.status == status)
+    if cursor:
+        query = query.where(Campaign.id < decode_cursor(cursor))
+
+    headers = {}
+    rows = (await db.execute(query.order_by(Campaign.id.desc()).limit(limit + 1))).mappings().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1]["id"])
+    return rows_response(rows, selected, headers)
+
+@router.get("/logs", response_model=List[CampaignLogRead])
+async def list_logs(
+    campaign_id: Optional[int] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields, e.g. id,status,sent_at"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Campaign logs, newest first. Pass X-Next-Cursor back as `cursor` for the next page.
+    Campaign and contact names are only joined in when requested.
+    """
+    selected = parse_fields(fields, LOG_FIELDS)
+    columns = [getattr(CampaignLog, name) for name in LOG_COLUMNS if name in selected or name == "id"]
+    query = select(*columns)
+    if "campaign_name" in selected:
+        query = query.add_columns(Campaign.name.label("campaign_name")).outerjoin(Campaign, Campaign.id == CampaignLog.campaign_id)
+    if "contact_name" in selected:
+        query = query.add_columns(Contact.name.label("contact_name")).outerjoin(Contact, Contact.id == CampaignLog.contact_id)
+    if campaign_id is not None:
+        query = query.where(CampaignLog.campaign_id == campaign_id)
+    if status:
+        query = query.where(CampaignLog.status == status)
+    if cursor:
+        query = query.where(CampaignLog.id < decode_cursor(cursor))
+
+    # Log ids follow sent_at, ordering by id lets the keyset use the indexes
+    headers = {}
+    logs = (await db.execute(query.order_by(CampaignLog.id.desc()).limit(limit + 1))).mappings().all()
+    if len(logs) > limit:
+        logs = logs[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(logs[-1]["id"])
+    return rows_response(logs, selected, headers)
+
+async def _get_campaign(db: AsyncSession, campaign_id: int) -> Campaign:
+    campaign = await db.get(Campaign, campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+@router.post("/{campaign_id}/pause", response_model=CampaignRead)
+async def pause(campaign_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Stops claiming recipients for the campaign. Messages the worker already
+    claimed still go out; the rest stay queued until resumed.
+    """
+    if not await pause_campaign(db, campaign_id):
+        campaign = await _get_campaign(db, campaign_id)
+        if campaign.status != PAUSED:
+            raise HTTPException(status_code=409, detail=f"Campaign is {campaign.status}, cannot be paused")
+    return await _get_campaign(db, campaign_id)
+
+@router.post("/{campaign_id}/resume", response_model=CampaignRead)
+async def resume(campaign_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Puts a paused campaign back in the queue (SCHEDULED again if its time has not come)."""
+    if not await resume_campaign(db, campaign_id):
+        campaign = await _get_campaign(db, campaign_id)
+        raise HTTPException(status_code=409, detail=f"Campaign is {campaign.status}, not paused")
+    return await _get_campaign(db, campaign_id)
+
+@router.get("/{campaign_id}/stats", response_model=CampaignStats)
+async def campaign_stats(campaign_id: int, db: AsyncSession = Depends(get_async_db)):
+    stats = await compute_campaign_stats(db, campaign_id)
+    if not stats:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return stats
+
+@router.get("/{campaign_id}/stats/daily", response_model=List[CampaignDailyStats])
+async def campaign_daily_stats(campaign_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Messages per day and status, including days whose raw logs were archived."""
+    await _get_campaign(db, campaign_id)
+    return await compute_daily_stats(db, campaign_id)
+
+@router.get("/{campaign_id}/events")
+async def campaign_events_stream(campaign_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Server-Sent Events with the campaign's progress (counts, throughput, ETA)
+    and, when the worker runs in this process, one event per message.
+    The stream ends when the campaign finishes.
+    """
+    await _get_campaign(db, campaign_id)
+    # The stream can stay open for hours; do not hold the session's connection meanwhile
+    await db.close()
+    subscription = campaign_events.subscribe(campaign_id)
+    progress_relay.watch(campaign_id)
+
+    async def stream():
+        try:
+            while True:
+                event = await subscription.get(timeout=15)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+                if event["type"] == "progress" and event["status"] in FINISHED_CAMPAIGN_STATUSES:
+                    return
+        finally:
+            campaign_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,44 +1,178 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+import os
+import tempfile
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.models.all_models import Contact, ContactStatus
-from app.schemas.all_schemas import ContactCreate, ContactRead, ContactUpdate
+from typing import List, Optional
+from app.core.config import get_settings
+from app.core.database import get_async_db, get_db
+from app.models.all_models import Contact
+from app.schemas.all_schemas import ContactCreate, ContactRead, ContactUpdate, ContactBulkResult, ImportJobRead, DuplicateScanRead
+from app.services.contact_service import bulk_insert_contacts
+from app.services.contact_dedupe import scan_duplicates
+from app.services.contact_io import detect_format, import_contacts_file, export_contacts
+from app.services.jobs import Job, job_registry
+from app.utils.address_parser import extract_city
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.projection import parse_fields, rows_response
 
+settings = get_settings()
 router = APIRouter()
 
+# Fields of ContactRead, in order; `cidade` is derived from the address
+CONTACT_FIELDS = (
+    "id", "name", "phone", "phone_type", "address", "category", "google_maps_link",
+    "place_id", "status", "replied_at", "created_at", "updated_at", "cidade",
+)
+
 @router.get("/", response_model=List[ContactRead])
-def read_contacts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    contacts = db.query(Contact).offset(skip).limit(limit).all()
-    return contacts
+async def read_contacts(
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=settings.CONTACTS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    q: Optional[str] = Query(None, description="Search in name and address"),
+    with_total: bool = False,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields, e.g. id,name,phone"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Lists contacts, newest first.
+    Pass the X-Next-Cursor response header back as `cursor` to get the next page
+    (keyset pagination, cost does not grow with the page number). `skip` still
+    works for old clients but is slow on deep pages.
+    X-Total-Count is only computed when `with_total=true`.
+    Runs on the event loop with the async session (the hottest read path):
+    only the requested columns are selected and the rows go straight to
+    orjson, without ORM objects or response-model validation.
+    """
+    selected = parse_fields(fields, CONTACT_FIELDS)
+    filters = []
+    if status:
+        filters.append(Contact.status == status)
+    if category:
+        filters.append(Contact.category == category)
+    if q:
+        pattern = f"%{q}%"
+        filters.append(or_(Contact.name.ilike(pattern), Contact.address.ilike(pattern)))
+
+    headers = {}
+    if with_total:
+        total = (await db.execute(select(func.count(Contact.id)).where(*filters))).scalar()
+        headers["X-Total-Count"] = str(total)
+
+    # id drives the cursor and address feeds cidade, so they are read even when not returned
+    columns = {name for name in selected if name != "cidade"} | {"id"}
+    if "cidade" in selected:
+        columns.add("address")
+    query = select(*[getattr(Contact, name) for name in CONTACT_FIELDS if name in columns]).where(*filters)
+    # Ids grow with created_at, so "id desc" is "newest first" without
+    # depending on timestamp precision (ties within the same second on SQLite)
+    if cursor:
+        query = query.where(Contact.id < decode_cursor(cursor))
+    elif skip:
+        query = query.offset(skip)
+
+    # One extra row tells us whether there is a next page
+    rows = (await db.execute(query.order_by(Contact.id.desc()).limit(limit + 1))).mappings().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1]["id"])
+    if "cidade" in selected:
+        rows = [{**row, "cidade": extract_city(row["address"])} for row in rows]
+    return rows_response(rows, selected, headers)
 
-@router.post("/", response_model=List[ContactRead])
+@router.post("/", response_model=ContactBulkResult)
 def create_contacts(contacts: List[ContactCreate], db: Session = Depends(get_db)):
     """
-    Bulk create contacts. Skips duplicates based on phone.
-    """
-    created_contacts = []
-    for contact_data in contacts:
-        # Check duplicate
-        existing = db.query(Contact).filter(Contact.phone == contact_data.phone).first()
-        if existing:
-            continue
-        
-        db_contact = Contact(
-            name=contact_data.name,
-            phone=contact_data.phone,
-            address=contact_data.address,
-            category=contact_data.category,
-            google_maps_link=contact_data.google_maps_link,
-            status=ContactStatus.PENDING
-        )
-        db.add(db_contact)
-        created_contacts.append(db_contact)
-    
-    db.commit()
-    for c in created_contacts:
-        db.refresh(c)
-    return created_contacts
+    Bulk create contacts. Skips duplicates based on phone and business
+    (Maps place id, name + address), both against the database and inside
+    the payload itself.
+    Phones are normalized; numbers that fail validation are counted as invalid and not stored.
+    """
+    result = bulk_insert_contacts(db, contacts)
+    return ContactBulkResult(inserted=result.inserted, skipped=result.skipped, invalid=result.invalid)
+
+@router.post("/import", response_model=ImportJobRead, status_code=202)
+async def import_contacts(file: UploadFile = File(...)):
+    """
+    Imports a CSV or NDJSON file (.ndjson/.jsonl) in the background.
+    Phones are normalized and duplicates skipped like in POST /contacts.
+    Poll GET /contacts/import/{job_id} for progress.
+    """
+    fmt = detect_format(file.filename, file.content_type)
+
+    # The upload is only valid during this request, so spool it to our own temp file
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{fmt}") as tmp:
+        while chunk := await file.read(1024 * 1024):
+            tmp.write(chunk)
+
+    async def work(job: Job):
+        try:
+            await asyncio.to_thread(import_contacts_file, tmp.name, fmt, job.progress)
+        finally:
+            os.unlink(tmp.name)
+
+    job = job_registry.submit("import", work)
+    return ImportJobRead(id=job.id, status=job.status, created_at=job.created_at)
+
+@router.get("/import/{job_id}", response_model=ImportJobRead)
+def read_import_job(job_id: str):
+    job = job_registry.get(job_id)
+    if not job or job.kind != "import":
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return ImportJobRead(
+        id=job.id,
+        status=job.status,
+        error=job.error,
+        progress=job.progress,
+        created_at=job.created_at,
+        finished_at=job.finished_at
+    )
+
+@router.post("/duplicates/scan", response_model=DuplicateScanRead, status_code=202)
+async def start_duplicates_scan():
+    """
+    Scans every contact in the background for the same business stored
+    under different phones (same Maps place id, or same normalized name +
+    address), backfilling those keys on older contacts as it goes.
+    Poll GET /contacts/duplicates/scan/{job_id} for progress and the groups.
+    """
+    async def work(job: Job):
+        await asyncio.to_thread(scan_duplicates, job.progress, job.results.extend)
+
+    job = job_registry.submit("duplicates", work)
+    return DuplicateScanRead(id=job.id, status=job.status, created_at=job.created_at)
+
+@router.get("/duplicates/scan/{job_id}", response_model=DuplicateScanRead)
+def read_duplicates_scan(job_id: str, offset: int = 0, limit: int = Query(100, le=1000)):
+    job = job_registry.get(job_id)
+    if not job or job.kind != "duplicates":
+        raise HTTPException(status_code=404, detail="Duplicates scan not found")
+    return DuplicateScanRead(
+        id=job.id,
+        status=job.status,
+        error=job.error,
+        progress=job.progress,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        total=len(job.results),
+        groups=job.results[offset:offset + limit]
+    )
+
+@router.get("/export")
+def export_contacts_file(format: str = Query("csv", pattern="^(csv|ndjson)$")):
+    """Streams every contact as CSV or NDJSON without loading the table in memory."""
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_contacts(format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'}
+    )
 
 @router.delete("/{contact_id}")
 def delete_contact(contact_id: int, db: Session = Depends(get_db)):
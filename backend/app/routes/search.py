@@ -1,7 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
 from typing import List
-from app.schemas.all_schemas import SearchRequest, ContactCreate
-from app.services.apify_service import apify_service
+from app.core.database import get_db
+from app.schemas.all_schemas import SearchRequest, ContactCreate, SearchJobRead, SearchCacheStats
+from app.services import search_service
+from app.services.jobs import Job, job_registry
+from app.services.search_cache import search_cache
 
 router = APIRouter()
 
@@ -12,7 +17,7 @@ async def search_contacts(request: SearchRequest):
     Does NOT save to DB automatically. Returns results for review.
     """
     try:
-        contacts = await apify_service.search_google_maps(
+        contacts = await search_service.search(
             terms=request.terms,
             locations=request.locations,
             limit=request.limit
@@ -20,3 +25,58 @@ async def search_contacts(request: SearchRequest):
         return contacts
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+def _get_search_job(job_id: str) -> Job:
+    job = job_registry.get(job_id)
+    if not job or job.kind != "search":
+        raise HTTPException(status_code=404, detail="Search job not found")
+    return job
+
+@router.post("/jobs", response_model=SearchJobRead, status_code=202)
+async def create_search_job(request: SearchRequest):
+    """
+    Starts the scrape in the background and returns a job id right away.
+    Results can be paged (GET /jobs/{id}) or streamed (GET /jobs/{id}/stream) while it runs.
+    `progress` counts the Apify shards; queries of failed shards are listed in
+    `progress.failed_queries` while the job still succeeds with the rest.
+    """
+    async def work(job: Job):
+        async for contact in search_service.stream_search(request.terms, request.locations, request.limit, job.progress):
+            job.add_results([contact])
+
+    job = job_registry.submit("search", work)
+    return SearchJobRead(id=job.id, status=job.status, total=0, created_at=job.created_at)
+
+@router.get("/jobs/{job_id}", response_model=SearchJobRead)
+def read_search_job(job_id: str, offset: int = 0, limit: int = Query(100, le=1000)):
+    job = _get_search_job(job_id)
+    return SearchJobRead(
+        id=job.id,
+        status=job.status,
+        error=job.error,
+        total=len(job.results),
+        progress=job.progress,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        items=job.results[offset:offset + limit]
+    )
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_search_job(job_id: str, offset: int = 0):
+    """NDJSON stream: one contact per line, follows the job until it finishes."""
+    job = _get_search_job(job_id)
+
+    async def lines():
+        async for contact in job.follow(offset):
+            yield contact.model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/cache/stats", response_model=SearchCacheStats)
+def read_cache_stats(db: Session = Depends(get_db)):
+    return search_cache.stats(db)
+
+@router.delete("/cache")
+def clear_cache(db: Session = Depends(get_db)):
+    search_cache.clear(db)
+    return {"ok": True}
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from app.core.database import get_async_db
+from app.models.all_models import Campaign, Segment
+from app.schemas.all_schemas import SegmentCreate, SegmentRead, SegmentCount
+from app.services.segments import count_segment
+
+router = APIRouter()
+
+async def _get_segment(db: AsyncSession, segment_id: int) -> Segment:
+    segment = await db.get(Segment, segment_id)
+    if not segment:
+        raise HTTPException(status_code=404, detail="Segment not found")
+    return segment
+
+@router.get("/", response_model=List[SegmentRead])
+async def list_segments(db: AsyncSession = Depends(get_async_db)):
+    return (await db.execute(select(Segment).order_by(Segment.id))).scalars().all()
+
+@router.post("/", response_model=SegmentRead)
+async def create_segment(segment_in: SegmentCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Saves a contact filter to target campaigns with (POST /campaigns with
+    `segment_id`). Filters are combined with AND; unset ones match everyone.
+    """
+    if (await db.execute(select(Segment.id).where(Segment.name == segment_in.name))).first():
+        raise HTTPException(status_code=409, detail="A segment with this name already exists")
+    segment = Segment(**segment_in.model_dump())
+    db.add(segment)
+    await db.commit()
+    await db.refresh(segment)
+    return segment
+
+@router.get("/{segment_id}", response_model=SegmentRead)
+async def read_segment(segment_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await _get_segment(db, segment_id)
+
+@router.get("/{segment_id}/count", response_model=SegmentCount)
+async def read_segment_count(segment_id: int, db: AsyncSession = Depends(get_async_db)):
+    """How many contacts the segment matches right now (before the sendable-phone filter)."""
+    segment = await _get_segment(db, segment_id)
+    return SegmentCount(segment_id=segment.id, contacts=await count_segment(db, segment))
+
+@router.delete("/{segment_id}")
+async def delete_segment(segment_id: int, db: AsyncSession = Depends(get_async_db)):
+    segment = await _get_segment(db, segment_id)
+    if (await db.execute(select(Campaign.id).where(Campaign.segment_id == segment_id).limit(1))).first():
+        raise HTTPException(status_code=409, detail="Segment is used by a campaign")
+    await db.delete(segment)
+    await db.commit()
+    return {"ok": True}
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.core.database import get_db
-from app.models.all_models import Template
-from app.schemas.all_schemas import TemplateCreate, TemplateRead
+from app.models.all_models import Campaign, Contact, Template
+from app.schemas.all_schemas import TemplateCreate, TemplateRead, TemplatePreview
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.template_engine import compile_template, contact_values, TemplateError
 
 router = APIRouter()
 
@@ -13,17 +15,65 @@ def read_templates(db: Session = Depends(get_db)):
 
 @router.post("/", response_model=TemplateRead)
 def create_template(template: TemplateCreate, db: Session = Depends(get_db)):
+    # Parse once here so a stray "{" or unknown placeholder never reaches a campaign
+    try:
+        compile_template(template.content)
+    except TemplateError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
     db_template = Template(**template.model_dump())
     db.add(db_template)
     db.commit()
     db.refresh(db_template)
     return db_template
 
+@router.get("/{template_id}/preview", response_model=List[TemplatePreview])
+def preview_template(
+    template_id: int,
+    response: Response,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Renders the template for `limit` contacts at a time (newest first).
+    Pass X-Next-Cursor back as `cursor` for the next batch.
+    """
+    template = db.query(Template).filter(Template.id == template_id).first()
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+    try:
+        compiled = compile_template(template.content)
+    except TemplateError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    query = db.query(Contact.id, Contact.name, Contact.phone, Contact.address, Contact.category)
+    if status:
+        query = query.filter(Contact.status == status)
+    if cursor:
+        query = query.filter(Contact.id < decode_cursor(cursor))
+    rows = query.order_by(Contact.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].id)
+
+    messages = compiled.render_many(
+        contact_values(row.name, row.address, row.category, row.phone) for row in rows
+    )
+    return [
+        TemplatePreview(contact_id=row.id, name=row.name or "", phone=row.phone, message=message)
+        for row, message in zip(rows, messages)
+    ]
+
 @router.delete("/{template_id}")
 def delete_template(template_id: int, db: Session = Depends(get_db)):
     template = db.query(Template).filter(Template.id == template_id).first()
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
+    # Campaigns render it at send time
+    if db.query(Campaign.id).filter(Campaign.template_id == template_id).first():
+        raise HTTPException(status_code=409, detail="Template is used by a campaign")
     db.delete(template)
     db.commit()
     return {"ok": True}
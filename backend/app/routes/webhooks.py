@@ -0,0 +1,37 @@
+import hmac
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
+
+from app.core.config import get_settings
+from app.services.evolution_webhooks import webhook_buffer
+
+router = APIRouter()
+settings = get_settings()
+
+@router.post("/evolution")
+@router.post("/evolution/{event}")
+async def evolution_webhook(request: Request, event: Optional[str] = None, token: Optional[str] = None):
+    """
+    Receiver for Evolution's messages.update (delivery/read receipts) and
+    messages.upsert (replies) events. Works with the global webhook and
+    with "webhook by events", which appends the event name to the URL.
+
+    Events are only parsed and queued here, the database is written in
+    batches (services/evolution_webhooks). Other events are accepted and
+    ignored. A 503 means the buffer is full; Evolution retries it.
+    """
+    if settings.EVOLUTION_WEBHOOK_TOKEN and not hmac.compare_digest(token or "", settings.EVOLUTION_WEBHOOK_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid webhook token")
+    try:
+        payload = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Body is not valid JSON")
+    if event and isinstance(payload, dict) and not payload.get("event"):
+        payload["event"] = event
+
+    if not webhook_buffer.add_payload(payload):
+        raise HTTPException(status_code=503, detail="Webhook buffer is full")
+    return ORJSONResponse({"ok": True})
@@ -1,7 +1,15 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, computed_field, field_validator, model_validator
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime, timezone
 from app.models.all_models import ContactStatus
+from app.utils.address_parser import extract_city
+from app.utils.send_window import validate_window
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Aware UTC datetime; naive input is taken as UTC (SQLite stores no offset)."""
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
 
 # --- Contact Schemas ---
 class ContactBase(BaseModel):
@@ -10,6 +18,7 @@ class ContactBase(BaseModel):
     address: Optional[str] = None
     category: Optional[str] = None
     google_maps_link: Optional[str] = None
+    phone_type: Optional[str] = None
 
 class ContactCreate(ContactBase):
     pass
@@ -17,12 +26,47 @@ class ContactCreate(ContactBase):
 class ContactRead(ContactBase):
     id: int
     status: str
+    place_id: Optional[str] = None
+    replied_at: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
+    @computed_field
+    @property
+    def cidade(self) -> Optional[str]:
+        # Derived from the Google Maps address, same value as the {cidade} placeholder
+        return extract_city(self.address)
+
     class Config:
         from_attributes = True
 
+class ContactBulkResult(BaseModel):
+    inserted: int
+    skipped: int
+    invalid: int = 0
+
+class ImportJobRead(BaseModel):
+    id: str
+    status: str
+    error: Optional[str] = None
+    progress: dict = {}
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+class DuplicateGroup(BaseModel):
+    contact_ids: List[int] # oldest first
+    matched_on: List[str] # place_id, name_address
+
+class DuplicateScanRead(BaseModel):
+    id: str
+    status: str
+    error: Optional[str] = None
+    progress: dict = {}
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    total: int = 0
+    groups: List[DuplicateGroup] = []
+
 class ContactUpdate(BaseModel):
     name: Optional[str] = None
     phone: Optional[str] = None
@@ -43,25 +87,132 @@ class TemplateRead(TemplateBase):
     class Config:
         from_attributes = True
 
+class TemplatePreview(BaseModel):
+    contact_id: int
+    name: str
+    phone: str
+    message: str
+
+# --- Segment Schemas ---
+class SegmentBase(BaseModel):
+    name: str
+    status: Optional[str] = None
+    category: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    messaged_in_campaign_id: Optional[int] = None
+    not_messaged_in_campaign_id: Optional[int] = None
+
+class SegmentCreate(SegmentBase):
+    @field_validator("created_after", "created_before")
+    @classmethod
+    def to_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return _as_utc(value)
+
+class SegmentRead(SegmentBase):
+    id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class SegmentCount(BaseModel):
+    segment_id: int
+    contacts: int
+
 # --- Campaign Schemas ---
 class CampaignBase(BaseModel):
     name: str
     template_id: int
 
 class CampaignCreate(CampaignBase):
-    contact_ids: List[int]
+    # Either explicit contacts or a saved segment (resolved server-side)
+    contact_ids: Optional[List[int]] = None
+    segment_id: Optional[int] = None
+    scheduled_at: Optional[datetime] = None # not sent before this (naive times are UTC)
+    send_window: Optional[str] = None # "HH:MM-HH:MM" in CAMPAIGN_TIMEZONE, overrides CAMPAIGN_SEND_WINDOW
+    weight: int = Field(1, ge=1, le=100) # share of the send rate relative to other running campaigns
+
+    @field_validator("scheduled_at")
+    @classmethod
+    def to_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return _as_utc(value)
+
+    @field_validator("send_window")
+    @classmethod
+    def check_send_window(cls, value: Optional[str]) -> Optional[str]:
+        return validate_window(value) if value else None
+
+    @model_validator(mode="after")
+    def check_targets(self):
+        if (self.contact_ids is None) == (self.segment_id is None):
+            raise ValueError("pass either contact_ids or segment_id")
+        return self
 
 class CampaignRead(CampaignBase):
     id: int
     status: str
     created_at: datetime
+    scheduled_at: Optional[datetime] = None
+    send_window: Optional[str] = None
+    weight: Optional[int] = None
+    segment_id: Optional[int] = None
     # logs: List[CampaignLogRead] = []
 
     class Config:
         from_attributes = True
 
+class CampaignLogRead(BaseModel):
+    id: int
+    campaign_id: int
+    status: str
+    sent_at: Optional[datetime] = None
+    error_message: Optional[str] = None
+    delivery_status: Optional[str] = None # SERVER_ACK, DELIVERY_ACK, READ, PLAYED (Evolution webhooks)
+    delivered_at: Optional[datetime] = None
+    read_at: Optional[datetime] = None
+    replied_at: Optional[datetime] = None
+    campaign_name: Optional[str] = None
+    contact_name: Optional[str] = None
+
+class CampaignStats(BaseModel):
+    campaign_id: int
+    status: str
+    total: int
+    sent: int
+    error: int
+    skipped: int
+    pending: int
+    first_sent_at: Optional[datetime] = None
+    last_sent_at: Optional[datetime] = None
+    send_rate_per_minute: float
+    delivered: int = 0 # sent messages with a delivery receipt (read ones included)
+    read: int = 0
+    replied: int = 0
+
+class CampaignDailyStats(BaseModel):
+    day: date # UTC
+    status: str
+    count: int
+
 # --- Search Schemas ---
 class SearchRequest(BaseModel):
     terms: List[str]
     locations: List[str]
     limit: int = 50
+
+class SearchJobRead(BaseModel):
+    id: str
+    status: str
+    error: Optional[str] = None
+    total: int
+    progress: dict = {} # queries, cached, shards, shards_done, shards_failed, failed_queries, untagged_queries
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    items: List[ContactCreate] = []
+
+class SearchCacheStats(BaseModel):
+    entries: int
+    hits: int
+    misses: int
+    hit_ratio: float
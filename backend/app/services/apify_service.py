@@ -1,84 +1,286 @@
+import asyncio
+import random
+import time
 import httpx
 import logging
-from typing import List, Dict, Any
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, AsyncIterator
 from app.core.config import get_settings
+from app.core.http import create_apify_client
+from app.core.metrics import instrument_apify_service
 from app.schemas.all_schemas import ContactCreate
-from app.utils.phone_normalizer import normalize_phone
+from app.utils.phone_normalizer import PhoneType, classify_phone
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Actor run states after which the dataset will not grow anymore
+TERMINAL_RUN_STATUSES = ("SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT")
+# Answers worth retrying on a read; anything else is a real error
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class ApifyRunError(Exception):
+    """The actor run ended in a state other than SUCCEEDED."""
+
+
+def build_search_queries(terms: List[str], locations: List[str]) -> List[str]:
+    # Generate all combinations of terms and locations
+    return [f"{term} in {location}" for term in terms for location in locations]
+
+
+def query_location(query: str) -> str:
+    return query.rpartition(" in ")[2]
+
+
+def build_shards(queries: List[str], shard_size: Optional[int] = None) -> List[List[str]]:
+    """
+    Splits queries into actor runs: grouped by location (places found for
+    one city overlap, places of two cities do not), then at most
+    `shard_size` queries per run (0 = the whole location in one run).
+    """
+    shard_size = settings.APIFY_SHARD_SIZE if shard_size is None else shard_size
+    by_location: Dict[str, List[str]] = defaultdict(list)
+    for query in queries:
+        by_location[query_location(query)].append(query)
+    shards = []
+    for group in by_location.values():
+        size = shard_size or len(group)
+        shards += [group[start:start + size] for start in range(0, len(group), size)]
+    return shards
+
+
+def run_concurrency() -> int:
+    """Actor runs allowed at once: APIFY_MAX_CONCURRENT_RUNS, capped by what the memory budget fits."""
+    fits = settings.APIFY_MEMORY_BUDGET_MB // max(1, settings.APIFY_RUN_MEMORY_MB)
+    return max(1, min(settings.APIFY_MAX_CONCURRENT_RUNS, fits))
+
+
+def normalize_item(item: Dict[str, Any]) -> Optional[ContactCreate]:
+    """Maps one Google Maps dataset item to a contact. Returns None if it has no valid phone."""
+    phone = item.get("phoneUnformatted") or item.get("phone")
+
+    # Skip if no phone
+    if not phone:
+        return None
+
+    # Landlines are kept for the results table (tel: links); invalid numbers are useless
+    phone = classify_phone(phone)
+    if phone.type == PhoneType.INVALID:
+        return None
+
+    return ContactCreate(
+        name=item.get("title", "Unknown"),
+        phone=phone.phone,
+        phone_type=phone.type.value,
+        address=item.get("address"),
+        category=item.get("categoryName"),
+        google_maps_link=item.get("url")
+    )
+
+
 class ApifyService:
-    BASE_URL = "https://api.apify.com/v2"
 
-    async def search_google_maps(self, terms: List[str], locations: List[str], limit: int = 50) -> List[ContactCreate]:
-        """
-        Runs the Google Maps Scraper on Apify and returns normalized contacts.
-        """
-        # Generate all combinations of terms and locations
-        search_queries = []
-        for term in terms:
-            for location in locations:
-                search_queries.append(f"{term} in {location}")
-        
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self._client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # The app lifespan binds a shared client; standalone use (scripts) gets one lazily
+        if self._client is None:
+            self._client = create_apify_client()
+        return self._client
+
+    def bind_client(self, client: httpx.AsyncClient):
+        self._client = client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _params(self, **extra) -> Dict[str, Any]:
+        return {"token": settings.APIFY_API_KEY, **extra}
+
+    async def _request(self, method: str, url: str, **kwargs) -> Any:
+        # Reads (run status, dataset pages by offset) are safe to repeat; starting a run is not
+        retries = settings.APIFY_REQUEST_MAX_RETRIES if method == "GET" else 0
+        for attempt in range(retries + 1):
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == retries:
+                    raise
+                logger.warning(f"Apify {method} {url} failed ({e!r}), retrying")
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == retries:
+                    break
+                logger.warning(f"Apify {method} {url} answered {response.status_code}, retrying")
+            await asyncio.sleep(random.uniform(0, settings.APIFY_RETRY_BASE_SECONDS * 2 ** attempt))
+
+        if response.is_error:
+            logger.error(f"Apify Error Body: {response.text}")
+        response.raise_for_status()
+        return response.json()
+
+    async def start_run(self, search_queries: List[str], limit: int) -> Dict[str, Any]:
+        """Starts the actor without waiting for it. Returns the run object."""
         # Payload for compass/crawler-google-places
         input_data = {
             "searchStringsArray": search_queries,
-            "maxCrawledPlaces": limit,
+            # Per search string: a run now carries several queries, each gets up to `limit` places
+            "maxCrawledPlacesPerSearch": limit,
             "language": "pt-BR",
             "countryCode": "br", # prioritizing Brazil as per context
             "zoom": 14
         }
-        
         actor_id = settings.APIFY_ACTOR_ID.replace("/", "~")
-        url = f"{self.BASE_URL}/acts/{actor_id}/run-sync-get-dataset-items"
-        
-        params = {
-            "token": settings.APIFY_API_KEY,
-            "memory": 4096 # giving enough memory to crawler
-        }
+        logger.info(f"Starting Apify run for {len(search_queries)} queries: {search_queries}")
+        data = await self._request(
+            "POST", f"/acts/{actor_id}/runs",
+            json=input_data,
+            params=self._params(memory=settings.APIFY_RUN_MEMORY_MB) # giving enough memory to crawler
+        )
+        return data["data"]
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            try:
-                logger.info(f"Starting Apify task for {len(search_queries)} queries: {search_queries}")
-                response = await client.post(url, json=input_data, params=params)
-                
-                if response.is_error:
-                    logger.error(f"Apify Error Body: {response.text}")
-                
-                response.raise_for_status()
-                
-                items = response.json()
-                logger.info(f"Apify returned {len(items)} items")
-                
-                contacts = []
-                for item in items:
-                    phone = item.get("phoneUnformatted") or item.get("phone")
-                    
-                    # Skip if no phone
-                    if not phone:
-                        continue
-                        
-                    normalized_phone = normalize_phone(phone)
-                    
-                    # Create Contact object
-                    contact = ContactCreate(
-                        name=item.get("title", "Unknown"),
-                        phone=normalized_phone,
-                        address=item.get("address"),
-                        category=item.get("categoryName"),
-                        google_maps_link=item.get("url")
-                    )
-                    contacts.append(contact)
-                    
-                return contacts
-
-            except httpx.HTTPError as e:
-                logger.error(f"Apify API error: {e}")
-                # We already logged the body if is_error was true above
-                raise
-            except Exception as e:
-                logger.error(f"Unexpected error in Apify service: {e}")
-                raise
-
-apify_service = ApifyService()
+    async def get_run(self, run_id: str) -> Dict[str, Any]:
+        data = await self._request("GET", f"/actor-runs/{run_id}", params=self._params())
+        return data["data"]
+
+    async def abort_run(self, run_id: str):
+        try:
+            await self._request("POST", f"/actor-runs/{run_id}/abort", params=self._params())
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to abort Apify run {run_id}: {e}")
+
+    async def get_dataset_page(self, dataset_id: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        return await self._request(
+            "GET", f"/datasets/{dataset_id}/items",
+            params=self._params(offset=offset, limit=limit, clean="true")
+        )
+
+    async def iter_run_items(self, run: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams the dataset of a run page by page while the actor is still
+        scraping. Polls the run status whenever it catches up with the
+        dataset, and stops once the run has finished and everything was read.
+        """
+        run_id, dataset_id = run["id"], run["defaultDatasetId"]
+        status = run.get("status")
+        page_size = settings.APIFY_DATASET_PAGE_SIZE
+        deadline = time.monotonic() + settings.APIFY_RUN_TIMEOUT
+        offset = 0
+
+        while True:
+            page = await self.get_dataset_page(dataset_id, offset, page_size)
+            for item in page:
+                yield item
+            offset += len(page)
+            if len(page) == page_size:
+                continue # more is probably waiting, keep reading
+
+            if status in TERMINAL_RUN_STATUSES:
+                break
+            if time.monotonic() > deadline:
+                await self.abort_run(run_id)
+                raise ApifyRunError(f"Apify run {run_id} exceeded {settings.APIFY_RUN_TIMEOUT}s and was aborted")
+
+            await asyncio.sleep(settings.APIFY_POLL_INTERVAL)
+            # Read the status first so the next page covers everything written before it finished
+            status = (await self.get_run(run_id)).get("status")
+
+        logger.info(f"Apify run {run_id} finished with {status}, {offset} items")
+        if status != "SUCCEEDED":
+            raise ApifyRunError(f"Apify run {run_id} ended with status {status}")
+
+    async def _run_shard(self, queries: List[str], limit: int, out: asyncio.Queue) -> bool:
+        """
+        One actor run over `queries`; puts (query, contact) on `out` as the
+        dataset fills. Returns False if some places could not be told apart
+        by query (no searchString on a multi-query run).
+        """
+        run = await self.start_run(queries, limit)
+        tagged = True
+        try:
+            async for item in self.iter_run_items(run):
+                contact = normalize_item(item)
+                if contact:
+                    # The actor tags each place with the search string that found it
+                    query = item.get("searchString") or (queries[0] if len(queries) == 1 else None)
+                    tagged = tagged and query is not None
+                    await out.put((query, contact))
+        except asyncio.CancelledError:
+            # Nobody reads the results anymore; stop paying for the run
+            await self.abort_run(run["id"])
+            raise
+        return tagged
+
+    async def stream_shards(
+        self, queries: List[str], limit: int, progress: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[tuple]:
+        """
+        Scrapes `queries` as several actor runs (see build_shards), at most
+        run_concurrency() at a time, each with its own `limit` per query and
+        APIFY_RUN_TIMEOUT. Yields (query, contact) from whichever run has
+        items, so results arrive while the slower shards are still running.
+
+        A shard that fails (start refused, run FAILED/TIMED-OUT, reads still
+        failing after retries) is logged and its queries are listed in
+        progress["failed_queries"]; the others carry on. Raises only when
+        every shard failed. Queries of a run whose places came back without
+        their search string go to progress["untagged_queries"].
+        """
+        shards = build_shards(queries)
+        progress = {} if progress is None else progress
+        progress.update(shards=len(shards), shards_done=0, shards_failed=0, failed_queries=[], untagged_queries=[])
+        semaphore = asyncio.Semaphore(run_concurrency())
+        # Bounded, so runs wait for the consumer instead of piling pages up in memory
+        out: asyncio.Queue = asyncio.Queue(maxsize=settings.APIFY_DATASET_PAGE_SIZE)
+        errors: List[Exception] = []
+        done = object()
+
+        async def run_shard(shard: List[str]):
+            async with semaphore:
+                try:
+                    if not await self._run_shard(shard, limit, out):
+                        progress["untagged_queries"] += shard
+                    progress["shards_done"] += 1
+                except Exception as e:
+                    logger.warning(f"Apify shard of {len(shard)} queries failed, continuing without it: {e}")
+                    errors.append(e)
+                    progress["shards_failed"] += 1
+                    progress["failed_queries"] += shard
+
+        async def run_all():
+            await asyncio.gather(*(run_shard(shard) for shard in shards))
+            await out.put(done)
+
+        logger.info(f"Scraping {len(queries)} queries in {len(shards)} Apify runs, {run_concurrency()} at a time")
+        runner = asyncio.create_task(run_all())
+        try:
+            while (entry := await out.get()) is not done:
+                yield entry
+        finally:
+            if not runner.done():
+                runner.cancel() # the consumer went away
+            await asyncio.gather(runner, return_exceptions=True)
+
+        if errors and len(errors) == len(shards):
+            raise ApifyRunError(f"All {len(shards)} Apify runs failed, first error: {errors[0]}")
+
+    async def stream_google_maps(self, terms: List[str], locations: List[str], limit: int = 50) -> AsyncIterator[ContactCreate]:
+        """
+        Runs the Google Maps Scraper asynchronously (sharded, see
+        stream_shards) and yields normalized contacts as soon as they land
+        in the runs' datasets.
+        """
+        async for _, contact in self.stream_shards(build_search_queries(terms, locations), limit):
+            yield contact
+
+    async def search_google_maps(self, terms: List[str], locations: List[str], limit: int = 50) -> List[ContactCreate]:
+        """
+        Runs the Google Maps Scraper on Apify and returns normalized contacts.
+        """
+        return [contact async for contact in self.stream_google_maps(terms, locations, limit)]
+
+apify_service = instrument_apify_service(ApifyService())
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, Optional, Set
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.services.campaign_stats import compute_campaign_stats
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+FINISHED_CAMPAIGN_STATUSES = ("COMPLETED", "ERROR")
+
+
+class Subscription:
+    """
+    One client's view of a campaign's events.
+
+    Per-message events are queued up to `max_messages`; past that the
+    oldest are dropped and reported as a single "coalesced" event.
+    Progress snapshots are never queued: a slow client just gets the
+    latest one.
+    """
+
+    def __init__(self, campaign_id: int, max_messages: int):
+        self.campaign_id = campaign_id
+        self._messages: deque = deque(maxlen=max_messages)
+        self._progress: Optional[Dict[str, Any]] = None
+        self._dropped = 0
+        self._ready = asyncio.Event()
+
+    def push(self, event: Dict[str, Any]):
+        if event["type"] == "progress":
+            self._progress = event
+        else:
+            if len(self._messages) == self._messages.maxlen:
+                self._dropped += 1
+            self._messages.append(event)
+        self._ready.set()
+
+    def _pop(self) -> Optional[Dict[str, Any]]:
+        if self._dropped:
+            dropped, self._dropped = self._dropped, 0
+            return {"type": "coalesced", "dropped": dropped}
+        if self._messages:
+            return self._messages.popleft()
+        if self._progress:
+            progress, self._progress = self._progress, None
+            return progress
+        return None
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Next event, or None if nothing happened within `timeout` seconds."""
+        event = self._pop()
+        if event is None:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+            event = self._pop()
+        return event
+
+
+class CampaignEventBus:
+    """
+    In-process pub/sub for campaign progress. Publishing to a campaign
+    nobody is watching is a dict lookup, so the worker can publish freely.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, campaign_id: int) -> Subscription:
+        subscription = Subscription(campaign_id, settings.CAMPAIGN_EVENTS_MAX_QUEUED)
+        self._subscribers[campaign_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.campaign_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.campaign_id]
+
+    def has_subscribers(self, campaign_id: int) -> bool:
+        return bool(self._subscribers.get(campaign_id))
+
+    def publish(self, campaign_id: int, event: Dict[str, Any]):
+        for subscription in self._subscribers.get(campaign_id, ()):
+            subscription.push(event)
+
+
+class CampaignProgressRelay:
+    """
+    Publishes a progress snapshot (counts, throughput, ETA) for every
+    watched campaign every CAMPAIGN_EVENTS_INTERVAL seconds. This also
+    covers workers running in another process. One stats query per
+    watched campaign per tick, however many clients are connected.
+    """
+
+    def __init__(self, bus: CampaignEventBus):
+        self.bus = bus
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def watch(self, campaign_id: int):
+        task = self._tasks.get(campaign_id)
+        if task is None or task.done():
+            self._tasks[campaign_id] = asyncio.create_task(self._poll(campaign_id))
+
+    async def _snapshot(self, campaign_id: int):
+        async with AsyncSessionLocal() as db:
+            return await compute_campaign_stats(db, campaign_id)
+
+    async def _poll(self, campaign_id: int):
+        last_done, last_time = None, None
+        try:
+            while self.bus.has_subscribers(campaign_id):
+                stats = await self._snapshot(campaign_id)
+                if stats is None:
+                    return
+
+                done = stats.sent + stats.error + stats.skipped
+                now = time.monotonic()
+                per_minute = stats.send_rate_per_minute
+                if last_done is not None and now > last_time:
+                    per_minute = (done - last_done) / ((now - last_time) / 60)
+                last_done, last_time = done, now
+
+                event = {"type": "progress", **stats.model_dump(mode="json")}
+                event["throughput_per_minute"] = round(per_minute, 2)
+                event["eta_seconds"] = round(stats.pending / per_minute * 60) if per_minute > 0 else None
+                self.bus.publish(campaign_id, event)
+
+                if stats.status in FINISHED_CAMPAIGN_STATUSES:
+                    return
+                await asyncio.sleep(settings.CAMPAIGN_EVENTS_INTERVAL)
+        except Exception as e:
+            logger.error(f"Progress relay for campaign {campaign_id} failed: {e}")
+        finally:
+            self._tasks.pop(campaign_id, None)
+
+
+campaign_events = CampaignEventBus()
+progress_relay = CampaignProgressRelay(campaign_events)
@@ -0,0 +1,353 @@
+import heapq
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update, insert, literal, and_, or_, exists, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.all_models import Campaign, CampaignRecipient, Contact, RecipientStatus
+from app.utils.phone_normalizer import PhoneType, normalize_phones
+from app.utils.send_window import in_send_window
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Campaign states the worker is allowed to pick recipients from
+ACTIVE_CAMPAIGN_STATUSES = ("QUEUED", "RUNNING")
+# Set by the worker when no Evolution instance is connected; undone once one reconnects
+PAUSED_DISCONNECTED = "PAUSED_DISCONNECTED"
+# Paused by hand (POST /campaigns/{id}/pause) until resumed
+PAUSED = "PAUSED"
+# Created with a future scheduled_at; claimable from then on like QUEUED
+SCHEDULED = "SCHEDULED"
+PAUSABLE_CAMPAIGN_STATUSES = ACTIVE_CAMPAIGN_STATUSES + (SCHEDULED, PAUSED_DISCONNECTED)
+
+
+@dataclass
+class ClaimedRecipient:
+    id: int
+    campaign_id: int
+    contact_id: int
+    phone: str
+    name: Optional[str]
+    address: Optional[str]
+    category: Optional[str]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def sendable_phone_types() -> List[str]:
+    types = [PhoneType.MOBILE.value]
+    if settings.CAMPAIGN_ALLOW_LANDLINES:
+        types.append(PhoneType.LANDLINE.value)
+    return types
+
+
+async def backfill_phone_types(db: AsyncSession, contact_ids: List[int]):
+    """Classifies contacts stored before phone_type existed. Does not commit."""
+    rows = (await db.execute(
+        select(Contact.id, Contact.phone).where(Contact.id.in_(contact_ids), Contact.phone_type.is_(None))
+    )).all()
+    if not rows:
+        return
+    by_type = {}
+    for row, info in zip(rows, normalize_phones(row.phone for row in rows)):
+        by_type.setdefault(info.type.value, []).append(row.id)
+    for phone_type, ids in by_type.items():
+        await db.execute(
+            update(Contact)
+            .where(Contact.id.in_(ids))
+            .values(phone_type=phone_type)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def enqueue_recipients(db: AsyncSession, campaign_id: int, contact_ids: List[int]) -> int:
+    """
+    Materializes the recipient rows of a campaign with INSERT ... SELECT,
+    so unknown contact ids are silently dropped, and so are contacts whose
+    phone is not sendable (invalid, or landline unless allowed). Does not commit.
+    """
+    unique_ids = list(dict.fromkeys(contact_ids))
+    chunk_size = settings.CONTACTS_BULK_CHUNK_SIZE
+    total = 0
+    for start in range(0, len(unique_ids), chunk_size):
+        chunk = unique_ids[start:start + chunk_size]
+        await backfill_phone_types(db, chunk)
+        source = select(
+            literal(campaign_id),
+            Contact.id,
+            literal(RecipientStatus.PENDING.value),
+            literal(0),
+        ).where(Contact.id.in_(chunk), Contact.phone_type.in_(sendable_phone_types()))
+        stmt = insert(CampaignRecipient).from_select(
+            ["campaign_id", "contact_id", "status", "attempts"], source
+        )
+        total += (await db.execute(stmt)).rowcount
+    return total
+
+
+def _campaign_runnable(now: datetime):
+    return or_(
+        Campaign.status.in_(ACTIVE_CAMPAIGN_STATUSES),
+        and_(Campaign.status == SCHEDULED, Campaign.scheduled_at <= now),
+    )
+
+
+def _recipient_claimable(now: datetime):
+    lease_expired = and_(
+        CampaignRecipient.status == RecipientStatus.IN_PROGRESS.value,
+        CampaignRecipient.locked_until < now,
+    )
+    return or_(CampaignRecipient.status == RecipientStatus.PENDING.value, lease_expired)
+
+
+def _claimable(now: datetime):
+    campaign_active = exists().where(
+        Campaign.id == CampaignRecipient.campaign_id,
+        _campaign_runnable(now),
+    )
+    return and_(_recipient_claimable(now), campaign_active)
+
+
+class FairShare:
+    """
+    Weighted fair split of each claim between runnable campaigns (stride
+    scheduling): every recipient given to a campaign advances its pass by
+    1/weight and the lowest pass goes next, so over time campaigns get
+    recipients in proportion to their weights, whatever their size. A
+    campaign joining (or coming back into its send window) starts at the
+    current minimum, neither starving the others nor being starved.
+
+    The pool paces sends per instance for the whole worker, so this only
+    decides whose messages use that budget.
+    """
+
+    def __init__(self):
+        self._pass: Dict[int, float] = {}
+
+    def split(self, candidates: Dict[int, List[int]], weights: Dict[int, int], size: int) -> List[int]:
+        """Picks up to `size` ids from {campaign_id: candidate ids, in queue order}."""
+        floor = min((self._pass[c] for c in candidates if c in self._pass), default=0.0)
+        # Campaigns no longer runnable are forgotten
+        self._pass = {c: self._pass.get(c, floor) for c in candidates}
+        queues = {c: deque(ids) for c, ids in candidates.items() if ids}
+        heap = [(self._pass[c], c) for c in queues]
+        heapq.heapify(heap)
+
+        chosen = []
+        while heap and len(chosen) < size:
+            position, campaign_id = heapq.heappop(heap)
+            chosen.append(queues[campaign_id].popleft())
+            position += 1.0 / weights.get(campaign_id, 1)
+            self._pass[campaign_id] = position
+            if queues[campaign_id]:
+                heapq.heappush(heap, (position, campaign_id))
+        return chosen
+
+
+fair_share = FairShare()
+
+
+async def runnable_campaigns(db: AsyncSession, now: Optional[datetime] = None) -> Dict[int, int]:
+    """
+    {campaign_id: weight} of the campaigns that may send right now: active
+    (or scheduled and due) and inside their send window.
+    """
+    now = now or _utcnow()
+    rows = (await db.execute(
+        select(Campaign.id, Campaign.weight, Campaign.send_window).where(_campaign_runnable(now))
+    )).all()
+    return {
+        row.id: row.weight or 1
+        for row in rows
+        if in_send_window(
+            now, row.send_window or settings.CAMPAIGN_SEND_WINDOW, settings.CAMPAIGN_SEND_WEEKDAYS, settings.CAMPAIGN_TIMEZONE
+        )
+    }
+
+
+async def claim_batch(
+    db: AsyncSession,
+    worker_id: str,
+    batch_size: Optional[int] = None,
+    lease_seconds: Optional[int] = None,
+    share: Optional[FairShare] = None,
+) -> List[ClaimedRecipient]:
+    """
+    Leases up to batch_size recipients to this worker and commits.
+
+    Only campaigns that may send now are considered (see
+    runnable_campaigns); each one offers its oldest claimable rows and
+    `share` picks the batch from them by weight.
+
+    On Postgres the candidate rows are read with FOR UPDATE SKIP LOCKED, so
+    concurrent workers get disjoint candidates instead of racing for the
+    same oldest rows; candidates not picked are released at commit.
+    SQLite has no row locks,
+    so the UPDATE re-checks the claim condition and only rows that still
+    match are leased (writers are serialized by the database file lock).
+    """
+    batch_size = batch_size or settings.CAMPAIGN_WORKER_BATCH_SIZE
+    lease_seconds = lease_seconds or settings.CAMPAIGN_WORKER_LEASE_SECONDS
+    share = share or fair_share
+    now = _utcnow()
+
+    lock_rows = db.bind.dialect.name == "postgresql"
+
+    weights = await runnable_campaigns(db, now)
+    candidates = {}
+    for campaign_id in weights:
+        query = (
+            select(CampaignRecipient.id)
+            .where(CampaignRecipient.campaign_id == campaign_id, _recipient_claimable(now))
+            .order_by(CampaignRecipient.id)
+            .limit(batch_size)
+        )
+        if lock_rows:
+            query = query.with_for_update(skip_locked=True)
+        candidates[campaign_id] = list((await db.execute(query)).scalars())
+    ids = share.split(candidates, weights, batch_size)
+
+    if not ids:
+        await db.rollback()
+        return []
+
+    await db.execute(
+        update(CampaignRecipient)
+        .where(CampaignRecipient.id.in_(ids), _claimable(now))
+        .values(
+            status=RecipientStatus.IN_PROGRESS.value,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=lease_seconds),
+            attempts=CampaignRecipient.attempts + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    rows = (await db.execute(
+        select(
+            CampaignRecipient.id,
+            CampaignRecipient.campaign_id,
+            CampaignRecipient.contact_id,
+            Contact.phone,
+            Contact.name,
+            Contact.address,
+            Contact.category,
+        )
+        .join(Contact, Contact.id == CampaignRecipient.contact_id)
+        .where(
+            CampaignRecipient.id.in_(ids),
+            CampaignRecipient.locked_by == worker_id,
+            CampaignRecipient.status == RecipientStatus.IN_PROGRESS.value,
+        )
+        .order_by(CampaignRecipient.id)
+    )).all()
+
+    # First claim flips the campaign from QUEUED (or SCHEDULED) to RUNNING
+    campaign_ids = {row.campaign_id for row in rows}
+    if campaign_ids:
+        await db.execute(
+            update(Campaign)
+            .where(Campaign.id.in_(campaign_ids), Campaign.status.in_(("QUEUED", SCHEDULED)))
+            .values(status="RUNNING")
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+
+    return [ClaimedRecipient(**row._mapping) for row in rows]
+
+
+async def release_recipients(db: AsyncSession, recipient_ids: List[int], worker_id: str):
+    """Hands leased rows back to the queue, e.g. on worker shutdown."""
+    if not recipient_ids:
+        return
+    await db.execute(
+        update(CampaignRecipient)
+        .where(
+            CampaignRecipient.id.in_(recipient_ids),
+            CampaignRecipient.locked_by == worker_id,
+            CampaignRecipient.status == RecipientStatus.IN_PROGRESS.value,
+        )
+        .values(status=RecipientStatus.PENDING.value, locked_by=None, locked_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+async def finalize_campaigns(db: AsyncSession) -> int:
+    """Marks active (or due) campaigns with no pending or leased recipients as COMPLETED."""
+    outstanding = exists().where(
+        CampaignRecipient.campaign_id == Campaign.id,
+        CampaignRecipient.status.in_((RecipientStatus.PENDING.value, RecipientStatus.IN_PROGRESS.value)),
+    )
+    result = await db.execute(
+        update(Campaign)
+        .where(_campaign_runnable(_utcnow()), ~outstanding)
+        .values(status="COMPLETED")
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def pause_active_campaigns(db: AsyncSession, status: str = PAUSED_DISCONNECTED) -> int:
+    """Stops the worker from claiming recipients of every active campaign."""
+    result = await db.execute(
+        update(Campaign)
+        .where(Campaign.status.in_(ACTIVE_CAMPAIGN_STATUSES))
+        .values(status=status)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def resume_paused_campaigns(db: AsyncSession, status: str = PAUSED_DISCONNECTED) -> int:
+    """Puts campaigns paused with `status` back in the queue."""
+    result = await db.execute(
+        update(Campaign)
+        .where(Campaign.status == status)
+        .values(status="QUEUED")
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def has_campaigns_in_status(db: AsyncSession, status: str) -> bool:
+    return (await db.execute(select(Campaign.id).where(Campaign.status == status).limit(1))).first() is not None
+
+
+async def pause_campaign(db: AsyncSession, campaign_id: int) -> bool:
+    """
+    Stops the worker from claiming more recipients of the campaign and
+    commits. Messages already claimed still go out. False if it could not
+    be paused (unknown, already paused or finished).
+    """
+    result = await db.execute(
+        update(Campaign)
+        .where(Campaign.id == campaign_id, Campaign.status.in_(PAUSABLE_CAMPAIGN_STATUSES))
+        .values(status=PAUSED)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def resume_campaign(db: AsyncSession, campaign_id: int) -> bool:
+    """Puts a campaign paused by hand back in the queue (or back to SCHEDULED if not due yet) and commits."""
+    result = await db.execute(
+        update(Campaign)
+        .where(Campaign.id == campaign_id, Campaign.status == PAUSED)
+        .values(status=case((Campaign.scheduled_at > _utcnow(), SCHEDULED), else_="QUEUED"))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount > 0
@@ -0,0 +1,80 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.all_models import Campaign, CampaignLog, CampaignLogDaily, CampaignRecipient, RecipientStatus
+from app.schemas.all_schemas import CampaignDailyStats, CampaignStats
+
+
+async def compute_campaign_stats(db: AsyncSession, campaign_id: int) -> Optional[CampaignStats]:
+    """Sent/error/pending counts from the recipient queue, send rate from the logs and their rollups. None if the campaign does not exist."""
+    campaign = (await db.execute(
+        select(Campaign.id, Campaign.status).where(Campaign.id == campaign_id)
+    )).first()
+    if not campaign:
+        return None
+
+    counts = dict((await db.execute(
+        select(CampaignRecipient.status, func.count(CampaignRecipient.id))
+        .where(CampaignRecipient.campaign_id == campaign_id)
+        .group_by(CampaignRecipient.status)
+    )).all())
+    # Logs past retention only survive as daily rollups, so both are combined
+    live = (await db.execute(
+        select(
+            func.count(CampaignLog.id), func.min(CampaignLog.sent_at), func.max(CampaignLog.sent_at),
+            func.count(CampaignLog.delivered_at), func.count(CampaignLog.read_at), func.count(CampaignLog.replied_at),
+        )
+        .where(CampaignLog.campaign_id == campaign_id, CampaignLog.status == "SENT")
+    )).one()
+    rolled_up = (await db.execute(
+        select(
+            func.sum(CampaignLogDaily.count), func.min(CampaignLogDaily.first_sent_at), func.max(CampaignLogDaily.last_sent_at),
+            func.sum(CampaignLogDaily.delivered), func.sum(CampaignLogDaily.read), func.sum(CampaignLogDaily.replied),
+        )
+        .where(CampaignLogDaily.campaign_id == campaign_id, CampaignLogDaily.status == "SENT")
+    )).one()
+    sent_count = live[0] + (rolled_up[0] or 0)
+    first_sent_at = min(filter(None, (rolled_up[1], live[1])), default=None)
+    last_sent_at = max(filter(None, (rolled_up[2], live[2])), default=None)
+
+    rate = 0.0
+    if sent_count and first_sent_at and last_sent_at and last_sent_at > first_sent_at:
+        rate = sent_count / ((last_sent_at - first_sent_at).total_seconds() / 60)
+
+    return CampaignStats(
+        campaign_id=campaign.id,
+        status=campaign.status,
+        total=sum(counts.values()),
+        sent=counts.get(RecipientStatus.SENT.value, 0),
+        error=counts.get(RecipientStatus.ERROR.value, 0),
+        skipped=counts.get(RecipientStatus.SKIPPED.value, 0),
+        pending=counts.get(RecipientStatus.PENDING.value, 0) + counts.get(RecipientStatus.IN_PROGRESS.value, 0),
+        first_sent_at=first_sent_at,
+        last_sent_at=last_sent_at,
+        send_rate_per_minute=round(rate, 2),
+        delivered=live[3] + (rolled_up[3] or 0),
+        read=live[4] + (rolled_up[4] or 0),
+        replied=live[5] + (rolled_up[5] or 0),
+    )
+
+
+async def compute_daily_stats(db: AsyncSession, campaign_id: int) -> List[CampaignDailyStats]:
+    """Messages per UTC day and status: rollups of archived logs plus the raw logs still in the table."""
+    counts: Dict[Tuple[str, str], int] = defaultdict(int)
+    rolled_up = await db.execute(
+        select(CampaignLogDaily.day, CampaignLogDaily.status, CampaignLogDaily.count)
+        .where(CampaignLogDaily.campaign_id == campaign_id)
+    )
+    day = func.date(CampaignLog.sent_at)
+    live = await db.execute(
+        select(day, CampaignLog.status, func.count(CampaignLog.id))
+        .where(CampaignLog.campaign_id == campaign_id)
+        .group_by(day, CampaignLog.status)
+    )
+    for rows in (rolled_up, live):
+        for log_day, status, count in rows:
+            counts[(str(log_day), status)] += count
+    return [CampaignDailyStats(day=log_day, status=status, count=count) for (log_day, status), count in sorted(counts.items())]
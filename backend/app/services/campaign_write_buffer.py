@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.all_models import CampaignLog, CampaignRecipient, Contact, ContactStatus, RecipientStatus
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SendOutcome:
+    recipient_id: int
+    campaign_id: int
+    contact_id: int
+    status: RecipientStatus # SENT, ERROR or SKIPPED
+    error_message: Optional[str] = None
+    message_id: Optional[str] = None # for matching delivery receipts
+
+
+class CampaignWriteBuffer:
+    """
+    Write-behind buffer for campaign results.
+
+    Instead of one transaction per message, outcomes are collected and
+    written every `flush_size` messages or `flush_interval` seconds:
+    one executemany INSERT into campaign_logs plus one UPDATE per status
+    for contacts and campaign_recipients. Recipients stay IN_PROGRESS
+    (leased) until their outcome is flushed, so a crash replays at most
+    the unflushed tail once the lease expires.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        flush_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self.flush_size = flush_size or settings.CAMPAIGN_WRITE_FLUSH_SIZE
+        self.flush_interval = flush_interval or settings.CAMPAIGN_WRITE_FLUSH_INTERVAL
+        self._outcomes: List[SendOutcome] = []
+        self._lock = asyncio.Lock()
+        self._ticker: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._outcomes)
+
+    def start(self):
+        if self._ticker is None:
+            self._ticker = asyncio.create_task(self._tick())
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def add(self, outcome: SendOutcome):
+        self._outcomes.append(outcome)
+        if len(self._outcomes) >= self.flush_size:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._outcomes:
+                return
+            outcomes, self._outcomes = self._outcomes, []
+            async with self.session_factory() as db:
+                try:
+                    await self._write(db, outcomes)
+                    await db.commit()
+                except Exception as e:
+                    await db.rollback()
+                    # Keep them for the next flush rather than losing the results
+                    self._outcomes = outcomes + self._outcomes
+                    logger.error(f"Failed to flush {len(outcomes)} campaign results: {e}")
+
+    async def _write(self, db: AsyncSession, outcomes: List[SendOutcome]):
+        # Core table insert keeps this one executemany (the ORM path splits on NULL error_message)
+        await db.execute(insert(CampaignLog.__table__), [
+            {
+                "campaign_id": o.campaign_id,
+                "contact_id": o.contact_id,
+                "status": o.status.value,
+                "error_message": o.error_message,
+                "message_id": o.message_id,
+            }
+            for o in outcomes
+        ])
+
+        contacts_by_status: Dict[str, List[int]] = defaultdict(list)
+        recipients_by_status: Dict[str, List[int]] = defaultdict(list)
+        for o in outcomes:
+            recipients_by_status[o.status.value].append(o.recipient_id)
+            # Skipped recipients were never messaged; the contact keeps its status
+            if o.status != RecipientStatus.SKIPPED:
+                contacts_by_status[ContactStatus(o.status.value).value].append(o.contact_id)
+
+        for status, ids in contacts_by_status.items():
+            await db.execute(
+                update(Contact)
+                .where(Contact.id.in_(ids))
+                .values(status=status)
+                .execution_options(synchronize_session=False)
+            )
+        for status, ids in recipients_by_status.items():
+            await db.execute(
+                update(CampaignRecipient)
+                .where(CampaignRecipient.id.in_(ids))
+                .values(status=status, locked_by=None, locked_until=None)
+                .execution_options(synchronize_session=False)
+            )
+
+    async def close(self):
+        """Stops the periodic flush and writes whatever is left."""
+        if self._ticker is not None:
+            self._ticker.cancel()
+            try:
+                await self._ticker
+            except asyncio.CancelledError:
+                pass
+            self._ticker = None
+        await self.flush()
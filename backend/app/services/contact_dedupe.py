@@ -0,0 +1,115 @@
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import bindparam, select, update
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.models.all_models import Contact
+from app.utils.dedupe import extract_place_id, name_address_key
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class _UnionFind:
+    """Groups contact ids; the root of a group is always its oldest (smallest) id."""
+
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+
+    def find(self, item: int) -> int:
+        root = item
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while item != root: # path compression
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a: int, b: int) -> int:
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            a, b = min(a, b), max(a, b)
+            self.parent[b] = a
+            self.parent.setdefault(a, a)
+        return a
+
+
+def scan_duplicates(progress: Dict[str, int], on_groups: Callable[[List[Dict[str, Any]]], None], batch_size: Optional[int] = None):
+    """
+    Walks every contact once in id order (keyset batches of
+    CONTACTS_DEDUPE_SCAN_BATCH_SIZE) and groups the ones that share a Maps
+    place id or a normalized name + address. Contacts stored before those
+    keys existed get them backfilled on the way, so later imports can
+    dedupe against them.
+
+    Groups are handed to `on_groups` at the end as
+    {"contact_ids": [oldest first], "matched_on": [...]}.
+    `progress` is updated in place. Runs in a worker thread.
+    """
+    batch_size = batch_size or settings.CONTACTS_DEDUPE_SCAN_BATCH_SIZE
+    progress.update(scanned=0, backfilled=0, groups=0, duplicates=0)
+    groups = _UnionFind()
+    owners: Dict[str, int] = {}
+    matched_on: Dict[int, Set[str]] = defaultdict(set)
+    table = Contact.__table__
+    backfill = (
+        update(table)
+        .where(table.c.id == bindparam("_id"))
+        .values(place_id=bindparam("_place_id"), dedupe_key=bindparam("_dedupe_key"))
+    )
+
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(Contact.id, Contact.name, Contact.address, Contact.google_maps_link, Contact.place_id, Contact.dedupe_key)
+                .where(Contact.id > last_id)
+                .order_by(Contact.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            stale = []
+            for row in rows:
+                place_id = extract_place_id(row.google_maps_link)
+                dedupe_key = name_address_key(row.name, row.address)
+                if (place_id, dedupe_key) != (row.place_id, row.dedupe_key):
+                    stale.append({"_id": row.id, "_place_id": place_id, "_dedupe_key": dedupe_key})
+                for kind, key in (("place_id", place_id), ("name_address", dedupe_key)):
+                    if not key:
+                        continue
+                    key = f"{kind}:{key}"
+                    if key in owners:
+                        matched_on[groups.union(owners[key], row.id)].add(kind)
+                    else:
+                        owners[key] = row.id
+
+            if stale:
+                db.execute(backfill, stale)
+                db.commit()
+            progress["scanned"] += len(rows)
+            progress["backfilled"] += len(stale)
+    finally:
+        db.close()
+
+    members: Dict[int, List[int]] = defaultdict(list)
+    for contact_id in list(groups.parent):
+        members[groups.find(contact_id)].append(contact_id)
+    reasons: Dict[int, Set[str]] = defaultdict(set)
+    for contact_id, kinds in matched_on.items():
+        reasons[groups.find(contact_id)].update(kinds)
+
+    result = [
+        {"contact_ids": sorted(ids), "matched_on": sorted(reasons[root])}
+        for root, ids in sorted(members.items())
+        if len(ids) > 1
+    ]
+    progress["groups"] = len(result)
+    progress["duplicates"] = sum(len(group["contact_ids"]) - 1 for group in result)
+    on_groups(result)
+    logger.info(f"Duplicates scan finished: {progress}")
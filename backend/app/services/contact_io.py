@@ -0,0 +1,169 @@
+import csv
+import io
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.models.all_models import Contact
+from app.schemas.all_schemas import ContactCreate
+from app.services.contact_service import bulk_insert_contacts
+from app.utils.phone_normalizer import PhoneType, classify_phone
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ["id", "name", "phone", "address", "category", "google_maps_link", "status", "created_at"]
+
+# Accepted header names per field (our own export, Portuguese sheets and raw Apify dumps)
+COLUMN_ALIASES = {
+    "name": ("name", "nome", "title"),
+    "phone": ("phone", "telefone", "phoneUnformatted"),
+    "address": ("address", "endereco", "endereço"),
+    "category": ("category", "categoria", "categoryName"),
+    "google_maps_link": ("google_maps_link", "url", "link"),
+}
+# Rejected rows listed (line and reason) in the import progress; the rest are only counted
+MAX_REPORTED_INVALID_ROWS = 100
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or (content_type or "").endswith("ndjson"):
+        return "ndjson"
+    return "csv"
+
+
+def _iter_rows(fh: io.TextIOBase, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Yields (line number, row). NDJSON rows are the raw line, decoded by
+    _decode_row, so one malformed line only rejects that row.
+    """
+    if fmt == "ndjson":
+        for number, line in enumerate(fh, start=1):
+            if line.strip():
+                yield number, line
+    else:
+        reader = csv.DictReader(fh)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def _decode_row(row: Any, fmt: str) -> Dict[str, Any]:
+    if fmt == "ndjson":
+        row = json.loads(row)
+    if not isinstance(row, dict):
+        raise ValueError(f"expected an object, got {type(row).__name__}")
+    return row
+
+
+def _text(value: Any) -> Optional[str]:
+    """Cell value as text: numbers and booleans are converted, nested objects are an error."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        raise ValueError(f"expected a text value, got {type(value).__name__}")
+    return str(value)
+
+
+def row_to_contact(row: Dict[str, Any]) -> Optional[ContactCreate]:
+    """
+    Maps one imported row to a contact with a normalized phone. None if the
+    phone is missing or invalid; ValueError if a field holds a nested value.
+    """
+    values = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        values[field] = _text(next((row[a] for a in aliases if row.get(a)), None))
+    phone = classify_phone(str(values["phone"] or ""))
+    if phone.type == PhoneType.INVALID:
+        return None
+    return ContactCreate(
+        name=values["name"] or "Unknown",
+        phone=phone.phone,
+        phone_type=phone.type.value,
+        address=values["address"],
+        category=values["category"],
+        google_maps_link=values["google_maps_link"],
+    )
+
+
+def import_contacts_file(path: str, fmt: str, progress: Dict[str, Any]):
+    """
+    Reads an uploaded file row by row and feeds chunks of
+    CONTACTS_BULK_CHUNK_SIZE contacts to the bulk insert (one commit per
+    chunk). A row that cannot be read (bad JSON, not an object, unusable
+    values) or has no valid phone is counted as invalid and the import goes
+    on; the first MAX_REPORTED_INVALID_ROWS are listed in
+    progress["invalid_rows"] with their line number.
+    `progress` is updated in place so the job endpoint can report it.
+    Runs in a worker thread.
+    """
+    progress.update(rows=0, inserted=0, skipped=0, invalid=0, invalid_rows=[])
+    chunk: List[ContactCreate] = []
+    db = SessionLocal()
+
+    def reject(line: int, reason: str):
+        progress["invalid"] += 1
+        if len(progress["invalid_rows"]) < MAX_REPORTED_INVALID_ROWS:
+            progress["invalid_rows"].append({"line": line, "reason": reason})
+
+    def flush():
+        result = bulk_insert_contacts(db, chunk)
+        progress["inserted"] += result.inserted
+        progress["skipped"] += result.skipped
+        chunk.clear()
+
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as fh:
+            for line, row in _iter_rows(fh, fmt):
+                progress["rows"] += 1
+                try:
+                    contact = row_to_contact(_decode_row(row, fmt))
+                except (ValueError, AttributeError, ValidationError) as e:
+                    reject(line, str(e).splitlines()[0])
+                    continue
+                if contact is None:
+                    reject(line, "missing or invalid phone")
+                    continue
+                chunk.append(contact)
+                if len(chunk) >= settings.CONTACTS_BULK_CHUNK_SIZE:
+                    flush()
+            if chunk:
+                flush()
+    finally:
+        db.close()
+    logger.info(f"Import finished: {progress}")
+
+
+def export_contacts(fmt: str) -> Iterator[str]:
+    """
+    Yields the contacts table as CSV or NDJSON text, a batch of rows at a
+    time, from a server-side cursor (nothing is materialized).
+    """
+    db = SessionLocal()
+    try:
+        stmt = select(*[getattr(Contact, c) for c in EXPORT_COLUMNS]).order_by(Contact.id)
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=settings.CONTACTS_BULK_CHUNK_SIZE))
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            for rows in result.partitions():
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str, ensure_ascii=False) + "\n"
+                    for row in rows
+                )
+    finally:
+        db.close()
@@ -0,0 +1,131 @@
+import logging
+from dataclasses import dataclass
+from typing import Iterable, List, Dict, Any, Optional, Tuple
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import get_settings
+from app.models.all_models import Contact, ContactStatus
+from app.schemas.all_schemas import ContactCreate
+from app.utils.dedupe import DedupeIndex, business_keys, extract_place_id, name_address_key
+from app.utils.phone_normalizer import PhoneType, normalize_phones
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BulkInsertResult:
+    inserted: int = 0
+    skipped: int = 0
+    invalid: int = 0
+
+
+def _chunks(rows: List[Dict[str, Any]], size: int):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _dedupe_payload(contacts: Iterable[ContactCreate]) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Normalizes and validates every phone in one batch, then keeps the first
+    occurrence of each normalized phone in the payload (and, with
+    CONTACTS_DEDUPE_BY_BUSINESS, of each Maps place / name + address).
+    Returns the unique rows, how many were duplicates and how many were invalid.
+    """
+    contacts = list(contacts)
+    phones = normalize_phones(c.phone for c in contacts)
+    index = DedupeIndex()
+    rows: List[Dict[str, Any]] = []
+    duplicates = invalid = 0
+    for contact, phone in zip(contacts, phones):
+        if phone.type == PhoneType.INVALID:
+            invalid += 1
+            continue
+        place_id = extract_place_id(contact.google_maps_link)
+        dedupe_key = name_address_key(contact.name, contact.address)
+        if settings.CONTACTS_DEDUPE_BY_BUSINESS:
+            keys = business_keys(phone.phone, place_id, dedupe_key)
+        else:
+            keys = business_keys(phone.phone, None, None)
+        if not index.add(keys):
+            duplicates += 1
+            continue
+        rows.append({
+            "name": contact.name,
+            "phone": phone.phone,
+            "phone_type": phone.type.value,
+            "address": contact.address,
+            "category": contact.category,
+            "google_maps_link": contact.google_maps_link,
+            "place_id": place_id,
+            "dedupe_key": dedupe_key,
+            "status": ContactStatus.PENDING.value,
+        })
+    return rows, duplicates, invalid
+
+
+def _drop_known_businesses(db: Session, chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drops rows whose place id or name + address key is already stored (one indexed lookup per chunk)."""
+    place_ids = [row["place_id"] for row in chunk if row["place_id"]]
+    dedupe_keys = [row["dedupe_key"] for row in chunk if row["dedupe_key"]]
+    if not place_ids and not dedupe_keys:
+        return chunk
+    known = set()
+    for place_id, dedupe_key in db.execute(
+        select(Contact.place_id, Contact.dedupe_key)
+        .where(or_(Contact.place_id.in_(place_ids), Contact.dedupe_key.in_(dedupe_keys)))
+    ):
+        known.update(business_keys(None, place_id, dedupe_key))
+    return [row for row in chunk if not known.intersection(business_keys(None, row["place_id"], row["dedupe_key"]))]
+
+
+def _insert_chunk_postgres(db: Session, chunk: List[Dict[str, Any]]) -> int:
+    # Single round-trip: the unique index on phone decides what is a duplicate
+    stmt = (
+        postgresql.insert(Contact)
+        .values(chunk)
+        .on_conflict_do_nothing(index_elements=["phone"])
+        .returning(Contact.id)
+    )
+    return len(db.execute(stmt).fetchall())
+
+
+def _insert_chunk_generic(db: Session, chunk: List[Dict[str, Any]]) -> int:
+    # Fallback (SQLite and others): one phone-set lookup, then one executemany insert
+    phones = [row["phone"] for row in chunk]
+    existing = set(db.execute(select(Contact.phone).where(Contact.phone.in_(phones))).scalars())
+    new_rows = [row for row in chunk if row["phone"] not in existing]
+    if new_rows:
+        # Core table insert: the ORM bulk path splits the executemany wherever NULLs differ
+        db.execute(insert(Contact.__table__), new_rows)
+    return len(new_rows)
+
+
+def bulk_insert_contacts(db: Session, contacts: Iterable[ContactCreate], chunk_size: Optional[int] = None) -> BulkInsertResult:
+    """
+    Inserts contacts in chunks, skipping phones that already exist in the
+    database or that repeat inside the payload, and dropping invalid
+    numbers. With CONTACTS_DEDUPE_BY_BUSINESS the same goes for a business
+    already stored under another phone (same Maps place, or same
+    normalized name + address). Commits once at the end.
+    """
+    chunk_size = chunk_size or settings.CONTACTS_BULK_CHUNK_SIZE
+    rows, duplicates, invalid = _dedupe_payload(contacts)
+    result = BulkInsertResult(skipped=duplicates, invalid=invalid)
+
+    insert_chunk = _insert_chunk_postgres if db.bind.dialect.name == "postgresql" else _insert_chunk_generic
+
+    for chunk in _chunks(rows, chunk_size):
+        size = len(chunk)
+        if settings.CONTACTS_DEDUPE_BY_BUSINESS:
+            chunk = _drop_known_businesses(db, chunk)
+        inserted = insert_chunk(db, chunk) if chunk else 0
+        result.inserted += inserted
+        result.skipped += size - inserted
+
+    db.commit()
+    logger.info(f"Bulk insert: {result.inserted} inserted, {result.skipped} skipped, {result.invalid} invalid")
+    return result
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import random
+from typing import Dict, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.evolution_service import EvolutionService, SendErrorCode, SendResult, evolution_service
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.rate_limiter import TokenBucket
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class InstancesUnavailableError(Exception):
+    """Every instance's circuit is open: they are disconnected from WhatsApp."""
+
+
+class SendCancelledError(Exception):
+    """The caller asked to stop before the message went out; nothing was sent."""
+
+
+class EvolutionInstancePool:
+    """
+    Spreads sends across every configured Evolution instance.
+
+    Each instance has its own token bucket, so pacing comes from the
+    limiter instead of a fixed sleep, and a semaphore bounds how many
+    sends are in flight at once across the whole pool.
+
+    Retryable failures (timeouts, 5xx, 429) are retried with exponential
+    backoff and full jitter. Failures that point at the instance are
+    confirmed with its connection state; a disconnected instance is taken
+    out of rotation by its circuit breaker until it reconnects.
+    """
+
+    def __init__(
+        self,
+        service: EvolutionService,
+        rates: Dict[str, float],
+        burst: int = 1,
+        concurrency: int = 4,
+        jitter_seconds: float = 0.0,
+        max_retries: int = 0,
+        retry_base_seconds: float = 2.0,
+        retry_max_seconds: float = 60.0,
+        failure_threshold: int = 3,
+        reset_seconds: float = 60.0,
+    ):
+        self.service = service
+        self.buckets = {name: TokenBucket(rate, burst) for name, rate in rates.items() if rate > 0}
+        if not self.buckets:
+            raise ValueError("No Evolution instance with a positive send rate configured")
+        self.breakers = {name: CircuitBreaker(failure_threshold, reset_seconds) for name in self.buckets}
+        self.jitter_seconds = jitter_seconds
+        self.max_retries = max(0, max_retries)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._lock = asyncio.Lock()
+
+    async def _check_instance(self, name: str) -> bool:
+        """Confirms an instance's connection state and opens or closes its circuit accordingly."""
+        breaker = self.breakers[name]
+        if await self.service.is_connected(name):
+            breaker.record_success()
+            return True
+        if breaker.opened_at is None:
+            logger.warning(f"Evolution instance {name} is disconnected, pausing sends through it")
+        breaker.trip()
+        return False
+
+    async def _available_instances(self) -> Dict[str, TokenBucket]:
+        available = {}
+        for name, bucket in self.buckets.items():
+            state = self.breakers[name].state
+            if state == CircuitBreaker.CLOSED or (state == CircuitBreaker.HALF_OPEN and await self._check_instance(name)):
+                available[name] = bucket
+        if not available:
+            raise InstancesUnavailableError("No connected Evolution instance")
+        return available
+
+    async def healthy(self) -> bool:
+        """Whether at least one instance can send (probes the ones whose circuit may close)."""
+        try:
+            await self._available_instances()
+            return True
+        except InstancesUnavailableError:
+            return False
+
+    @staticmethod
+    async def _sleep(seconds: float, stop: Optional[asyncio.Event]):
+        """asyncio.sleep that ends early with SendCancelledError once `stop` is set."""
+        if stop is None:
+            await asyncio.sleep(seconds)
+            return
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        if stop.is_set():
+            raise SendCancelledError("Send cancelled")
+
+    async def acquire_instance(self, stop: Optional[asyncio.Event] = None) -> str:
+        """
+        Waits for the connected instance whose next token is available
+        soonest and takes it. Raises InstancesUnavailableError if none is
+        connected, SendCancelledError if `stop` is set while waiting.
+        """
+        while True:
+            if stop is not None and stop.is_set():
+                raise SendCancelledError("Send cancelled")
+            buckets = await self._available_instances()
+            async with self._lock:
+                waits = {name: bucket.time_until_available() for name, bucket in buckets.items()}
+                name = min(waits, key=waits.get)
+                if waits[name] == 0 and self.buckets[name].try_acquire():
+                    return name
+            await self._sleep(waits[name], stop)
+
+    def _backoff(self, attempt: int, result: SendResult) -> float:
+        delay = random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt))
+        if result.retry_after:
+            delay = max(delay, min(result.retry_after, self.retry_max_seconds))
+        return delay
+
+    async def _record(self, name: str, result: SendResult):
+        breaker = self.breakers[name]
+        if result.success:
+            breaker.record_success()
+        elif result.error_code in SendErrorCode.INSTANCE_FAILURES:
+            if result.error_code == SendErrorCode.INSTANCE_DISCONNECTED or breaker.record_failure():
+                await self._check_instance(name)
+
+    async def send_text(self, phone: str, message: str, stop: Optional[asyncio.Event] = None) -> Tuple[SendResult, str]:
+        """
+        Returns (result of the last attempt, instance used).
+        Raises InstancesUnavailableError when no instance is connected, and
+        SendCancelledError when `stop` is set before the message goes out
+        (while paced, jittered or backing off; a request already sent is
+        never interrupted).
+        """
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                instance = await self.acquire_instance(stop)
+                if self.jitter_seconds > 0:
+                    await self._sleep(random.uniform(0, self.jitter_seconds), stop)
+                if stop is not None and stop.is_set():
+                    raise SendCancelledError("Send cancelled")
+                result = await self.service.send_text(phone=phone, message=message, instance=instance)
+            await self._record(instance, result)
+
+            if result.success or not result.retryable or attempt >= self.max_retries:
+                return result, instance
+            delay = self._backoff(attempt, result)
+            attempt += 1
+            logger.info(f"Retrying send to {phone} in {delay:.1f}s ({result.error_code}, attempt {attempt}/{self.max_retries})")
+            await self._sleep(delay, stop)
+
+
+def build_instance_pool(service: Optional[EvolutionService] = None) -> EvolutionInstancePool:
+    return EvolutionInstancePool(
+        service=service or evolution_service,
+        rates=settings.evolution_instance_rates,
+        burst=settings.EVOLUTION_RATE_BURST,
+        concurrency=settings.EVOLUTION_SEND_CONCURRENCY,
+        jitter_seconds=settings.EVOLUTION_SEND_JITTER_SECONDS,
+        max_retries=settings.EVOLUTION_SEND_MAX_RETRIES,
+        retry_base_seconds=settings.EVOLUTION_RETRY_BASE_SECONDS,
+        retry_max_seconds=settings.EVOLUTION_RETRY_MAX_SECONDS,
+        failure_threshold=settings.EVOLUTION_CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds=settings.EVOLUTION_CIRCUIT_RESET_SECONDS,
+    )
@@ -1,23 +1,127 @@
 import httpx
 import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 from app.core.config import get_settings
+from app.core.http import create_evolution_client
+from app.core.metrics import instrument_evolution_service
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+_NON_DIGITS = re.compile(r'\D')
+
+# Evolution answers a disconnected instance with a 400/500 carrying one of these
+_DISCONNECTED_MARKERS = ("connection closed", "not connected", "disconnected", "qrcode")
+
+
+class SendErrorCode:
+    TIMEOUT = "TIMEOUT"
+    CONNECTION_ERROR = "CONNECTION_ERROR"
+    RATE_LIMITED = "RATE_LIMITED"
+    SERVER_ERROR = "SERVER_ERROR"
+    NUMBER_NOT_FOUND = "NUMBER_NOT_FOUND"
+    INSTANCE_DISCONNECTED = "INSTANCE_DISCONNECTED"
+    INSTANCE_NOT_FOUND = "INSTANCE_NOT_FOUND"
+    UNAUTHORIZED = "UNAUTHORIZED"
+    BAD_REQUEST = "BAD_REQUEST"
+
+    # Worth trying again after a pause
+    RETRYABLE = (TIMEOUT, CONNECTION_ERROR, RATE_LIMITED, SERVER_ERROR)
+    # Point at the instance rather than the message; checked against its connection state
+    INSTANCE_FAILURES = (TIMEOUT, CONNECTION_ERROR, SERVER_ERROR, INSTANCE_DISCONNECTED)
+
+
+@dataclass
+class SendResult:
+    success: bool
+    error_code: Optional[str] = None
+    detail: Optional[str] = None
+    status_code: Optional[int] = None
+    retry_after: Optional[float] = None # seconds, from a Retry-After header
+    message_id: Optional[str] = None # WhatsApp message id (key.id), matched by delivery webhooks
+
+    @property
+    def retryable(self) -> bool:
+        return self.error_code in SendErrorCode.RETRYABLE
+
+    def describe(self) -> str:
+        """"CODE: detail", as stored in CampaignLog.error_message."""
+        if self.success:
+            return "OK"
+        return f"{self.error_code}: {self.detail}"[:500] if self.detail else self.error_code
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _message_id(response: httpx.Response) -> Optional[str]:
+    try:
+        return response.json()["key"]["id"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def classify_response(response: httpx.Response) -> SendResult:
+    """Maps an Evolution sendText response to a SendResult."""
+    status = response.status_code
+    if status < 400:
+        return SendResult(True, status_code=status, message_id=_message_id(response))
+
+    body = response.text[:300]
+    lowered = body.lower()
+    if status == 429:
+        code = SendErrorCode.RATE_LIMITED
+    elif '"exists":false' in lowered.replace(" ", ""):
+        code = SendErrorCode.NUMBER_NOT_FOUND
+    elif any(marker in lowered for marker in _DISCONNECTED_MARKERS):
+        code = SendErrorCode.INSTANCE_DISCONNECTED
+    elif status in (401, 403):
+        code = SendErrorCode.UNAUTHORIZED
+    elif status == 404:
+        code = SendErrorCode.INSTANCE_NOT_FOUND
+    elif status >= 500:
+        code = SendErrorCode.SERVER_ERROR
+    else:
+        code = SendErrorCode.BAD_REQUEST
+    return SendResult(False, code, f"HTTP {status} {body}".strip(), status_code=status, retry_after=_retry_after(response))
+
+
 class EvolutionService:
-    
-    def _get_headers(self):
-        return {
-            "apikey": settings.EVOLUTION_API_KEY,
-            "Content-Type": "application/json"
-        }
 
-    async def send_text(self, phone: str, message: str, delay: int = 2000) -> bool:
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self._client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # The app lifespan binds a shared client; standalone use (scripts) gets one lazily
+        if self._client is None:
+            self._client = create_evolution_client()
+        return self._client
+
+    def bind_client(self, client: httpx.AsyncClient):
+        self._client = client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _instance(self, instance: Optional[str]) -> str:
+        return instance or settings.evolution_instances[0]
+
+    async def send_text(self, phone: str, message: str, delay: int = 2000, instance: Optional[str] = None) -> SendResult:
         """
         Sends a text message using Evolution API.
+        Uses the first configured instance unless one is given.
+        Never raises: failures come back classified in the SendResult.
         """
-        url = f"{settings.EVOLUTION_API_URL}/message/sendText/{settings.EVOLUTION_INSTANCE_NAME}"
+        url = f"/message/sendText/{self._instance(instance)}"
         
         payload = {
             "number": phone,
@@ -31,26 +135,52 @@ class EvolutionService:
             }
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(url, json=payload, headers=self._get_headers())
-                response.raise_for_status()
-                data = response.json()
-                # Check for success in response body if Evolution returns structured data
-                # Usually Evolution returns the message object if successful
-                return True
-            except Exception as e:
-                logger.error(f"Failed to send message to {phone}: {e}")
-                return False
-
-    async def get_instance_status(self):
-        url = f"{settings.EVOLUTION_API_URL}/instance/connectionState/{settings.EVOLUTION_INSTANCE_NAME}"
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(url, headers=self._get_headers())
-                return response.json()
-            except Exception as e:
-                logger.error(f"Error fetching instance status: {e}")
-                return {"error": str(e)}
-
-evolution_service = EvolutionService()
+        try:
+            response = await self.client.post(url, json=payload)
+        except httpx.TimeoutException as e:
+            result = SendResult(False, SendErrorCode.TIMEOUT, str(e) or type(e).__name__)
+        except httpx.TransportError as e:
+            result = SendResult(False, SendErrorCode.CONNECTION_ERROR, str(e) or type(e).__name__)
+        else:
+            # Evolution returns the message object if successful
+            result = classify_response(response)
+
+        if not result.success:
+            logger.error(f"Failed to send message to {phone}: {result.describe()}")
+        return result
+
+    async def check_whatsapp_numbers(self, phones: List[str], instance: Optional[str] = None) -> Dict[str, Optional[str]]:
+        """
+        Asks WhatsApp which of the numbers have an account, in one call.
+        Returns {phone: jid or None} for the numbers that were answered;
+        raises on transport/HTTP errors so callers can tell "unknown" apart
+        from "not on WhatsApp".
+        """
+        url = f"/chat/whatsappNumbers/{self._instance(instance)}"
+        response = await self.client.post(url, json={"numbers": phones})
+        response.raise_for_status()
+
+        requested = {_NON_DIGITS.sub("", phone): phone for phone in phones}
+        answers: Dict[str, Optional[str]] = {}
+        for item in response.json():
+            phone = requested.get(_NON_DIGITS.sub("", str(item.get("number", ""))))
+            if phone is not None:
+                answers[phone] = item.get("jid") if item.get("exists") else None
+        return answers
+
+    async def is_connected(self, instance: Optional[str] = None) -> bool:
+        """Whether the instance's WhatsApp session is open."""
+        status = await self.get_instance_status(instance)
+        state = (status.get("instance") or {}).get("state") or status.get("state")
+        return state == "open"
+
+    async def get_instance_status(self, instance: Optional[str] = None):
+        url = f"/instance/connectionState/{self._instance(instance)}"
+        try:
+            response = await self.client.get(url)
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error fetching instance status: {e}")
+            return {"error": str(e)}
+
+evolution_service = instrument_evolution_service(EvolutionService())
@@ -0,0 +1,334 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import WEBHOOK_EVENTS
+from app.models.all_models import CampaignLog, CampaignRecipient, Contact, ContactStatus, DeliveryStatus, RecipientStatus
+from app.utils.phone_normalizer import classify_phone
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MESSAGES_UPDATE = "messages.update"
+MESSAGES_UPSERT = "messages.upsert"
+
+# Receipts in the order they happen; a log never moves back in this list
+DELIVERY_ORDER = (DeliveryStatus.SERVER_ACK, DeliveryStatus.DELIVERY_ACK, DeliveryStatus.READ, DeliveryStatus.PLAYED)
+# Baileys numeric ack codes, sent by some Evolution versions instead of names
+_ACK_CODES = {2: DeliveryStatus.SERVER_ACK, 3: DeliveryStatus.DELIVERY_ACK, 4: DeliveryStatus.READ, 5: DeliveryStatus.PLAYED}
+
+
+@dataclass
+class DeliveryEvent:
+    message_id: str
+    status: DeliveryStatus
+    received_at: datetime
+    received_monotonic: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class ReplyEvent:
+    phones: Tuple[str, ...] # candidates for contacts.phone (as sent by WhatsApp and normalized)
+    received_at: datetime
+
+
+def event_name(value: Optional[str]) -> str:
+    """"MESSAGES_UPDATE", "messages-update" (webhook by events) and "messages.update" are the same event."""
+    return (value or "").strip().lower().replace("_", ".").replace("-", ".")
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _records(data: Any) -> List[dict]:
+    if isinstance(data, list):
+        return [item for item in data if isinstance(item, dict)]
+    return [data] if isinstance(data, dict) else []
+
+
+def _delivery_status(value: Any) -> Optional[DeliveryStatus]:
+    if isinstance(value, int):
+        return _ACK_CODES.get(value)
+    if isinstance(value, str):
+        if value.isdigit():
+            return _ACK_CODES.get(int(value))
+        try:
+            return DeliveryStatus(value.upper())
+        except ValueError:
+            return None # PENDING, ERROR, DELETED...
+    return None
+
+
+def jid_phones(jid: Optional[str]) -> Tuple[str, ...]:
+    """
+    "551998765432@s.whatsapp.net" -> the number as WhatsApp sent it plus its
+    normalized form (WhatsApp still uses the 8-digit form for older
+    Brazilian mobiles, contacts.phone has the leading 9). Groups,
+    broadcasts and anonymous (lid) senders give nothing.
+    """
+    if not jid or "@" not in jid:
+        return ()
+    user, server = jid.split("@", 1)
+    if server != "s.whatsapp.net":
+        return ()
+    digits = user.split(":", 1)[0]
+    if not digits.isdigit():
+        return ()
+    normalized = classify_phone(digits).phone
+    return (digits,) if normalized == digits or not normalized else (digits, normalized)
+
+
+def parse_webhook(payload: Any, now: Optional[datetime] = None) -> Tuple[str, List[DeliveryEvent], List[ReplyEvent]]:
+    """
+    Reads an Evolution webhook body (v1 and v2 shapes; `data` may be one
+    record or a list). Returns (event name, delivery receipts for messages
+    we sent, replies received). Other events give empty lists.
+    """
+    if not isinstance(payload, dict):
+        return "", [], []
+    now = now or datetime.now(timezone.utc)
+    name = event_name(payload.get("event"))
+    deliveries: List[DeliveryEvent] = []
+    replies: List[ReplyEvent] = []
+
+    if name == MESSAGES_UPDATE:
+        for item in _records(payload.get("data")):
+            key = item.get("key") if isinstance(item.get("key"), dict) else {}
+            if item.get("fromMe", key.get("fromMe", True)) is False:
+                continue # receipt of a message the lead sent us
+            message_id = item.get("keyId") or key.get("id")
+            update_ = item.get("update") if isinstance(item.get("update"), dict) else {}
+            status = _delivery_status(item.get("status", update_.get("status")))
+            if message_id and status:
+                deliveries.append(DeliveryEvent(str(message_id), status, now))
+
+    elif name == MESSAGES_UPSERT:
+        for item in _records(payload.get("data")):
+            key = item.get("key") if isinstance(item.get("key"), dict) else {}
+            if key.get("fromMe"):
+                continue # our own sends echo back here
+            phones = jid_phones(key.get("remoteJid"))
+            if phones:
+                replies.append(ReplyEvent(phones, now))
+
+    return name, deliveries, replies
+
+
+class WebhookEventBuffer:
+    """
+    In-process buffer between the webhook route and the database.
+
+    The route only parses and appends (no I/O), so Evolution gets its 200
+    straight away however bursty the events are. Events are written every
+    `flush_size` events or `flush_interval` seconds: one UPDATE per
+    delivery status on campaign_logs (matched by message id) and one
+    UPDATE each for replying contacts (only those a campaign sent to)
+    and their latest sent log.
+
+    Receipts can arrive before the worker has flushed the log they belong
+    to; those are kept and retried for WEBHOOK_UNMATCHED_RETRY_SECONDS.
+    Past `max_events` queued, new events are refused so a stuck database
+    cannot grow the process without bound.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        flush_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_events: Optional[int] = None,
+        unmatched_retry_seconds: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self.flush_size = flush_size or settings.WEBHOOK_FLUSH_SIZE
+        self.flush_interval = flush_interval or settings.WEBHOOK_FLUSH_INTERVAL
+        self.max_events = max_events or settings.WEBHOOK_BUFFER_MAX_EVENTS
+        self.unmatched_retry_seconds = (
+            settings.WEBHOOK_UNMATCHED_RETRY_SECONDS if unmatched_retry_seconds is None else unmatched_retry_seconds
+        )
+        self._deliveries: List[DeliveryEvent] = []
+        self._replies: List[ReplyEvent] = []
+        self._lock = asyncio.Lock()
+        self._ticker: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._deliveries) + len(self._replies)
+
+    def start(self):
+        if self._ticker is None:
+            self._ticker = asyncio.create_task(self._tick())
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def add_payload(self, payload: Any) -> bool:
+        """Parses and queues one webhook body. False when the buffer is full and the events were dropped."""
+        name, deliveries, replies = parse_webhook(payload)
+        count = len(deliveries) + len(replies)
+        if not count:
+            # Only the two subscribed events get their own label
+            WEBHOOK_EVENTS.labels(name if name in (MESSAGES_UPDATE, MESSAGES_UPSERT) else "other", "ignored").inc()
+            return True
+        if len(self) + count > self.max_events:
+            WEBHOOK_EVENTS.labels(name, "dropped").inc(count)
+            return False
+
+        self._deliveries += deliveries
+        self._replies += replies
+        WEBHOOK_EVENTS.labels(name, "queued").inc(count)
+        # Flushing is never awaited by the request; one flush in the background at a time
+        if len(self) >= self.flush_size and self._ticker is not None and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+        return True
+
+    async def flush(self):
+        async with self._lock:
+            if not self._deliveries and not self._replies:
+                return
+            deliveries, self._deliveries = self._deliveries, []
+            replies, self._replies = self._replies, []
+            async with self.session_factory() as db:
+                try:
+                    unmatched = await self._write_deliveries(db, deliveries)
+                    await self._write_replies(db, replies)
+                    await db.commit()
+                except Exception as e:
+                    await db.rollback()
+                    # Keep them for the next flush rather than losing the receipts
+                    self._deliveries = deliveries + self._deliveries
+                    self._replies = replies + self._replies
+                    logger.error(f"Failed to flush {len(deliveries)} receipts and {len(replies)} replies: {e}")
+                    return
+
+            cutoff = time.monotonic() - self.unmatched_retry_seconds
+            retry = [event for event in unmatched if event.received_monotonic >= cutoff]
+            self._deliveries = retry + self._deliveries
+            if len(unmatched) > len(retry):
+                # Messages not sent by a campaign (or logs already deleted by retention)
+                WEBHOOK_EVENTS.labels(MESSAGES_UPDATE, "unmatched").inc(len(unmatched) - len(retry))
+
+    async def _write_deliveries(self, db: AsyncSession, events: List[DeliveryEvent]) -> List[DeliveryEvent]:
+        """Applies receipts; returns the ones whose message id is not in campaign_logs (yet)."""
+        if not events:
+            return []
+        # Only the furthest receipt per message matters
+        latest: Dict[str, DeliveryEvent] = {}
+        for event in events:
+            current = latest.get(event.message_id)
+            if current is None or DELIVERY_ORDER.index(event.status) > DELIVERY_ORDER.index(current.status):
+                latest[event.message_id] = event
+
+        found: Set[str] = set()
+        for ids in _chunks(list(latest), self.flush_size):
+            found.update((await db.execute(select(CampaignLog.message_id).where(CampaignLog.message_id.in_(ids)))).scalars())
+
+        by_status: Dict[DeliveryStatus, List[DeliveryEvent]] = defaultdict(list)
+        for event in latest.values():
+            if event.message_id in found:
+                by_status[event.status].append(event)
+        for status, group in by_status.items():
+            rank = DELIVERY_ORDER.index(status)
+            values: Dict[str, Any] = {"delivery_status": status.value}
+            at = min(event.received_at for event in group)
+            if rank >= DELIVERY_ORDER.index(DeliveryStatus.DELIVERY_ACK):
+                values["delivered_at"] = func.coalesce(CampaignLog.delivered_at, at)
+            if rank >= DELIVERY_ORDER.index(DeliveryStatus.READ):
+                values["read_at"] = func.coalesce(CampaignLog.read_at, at)
+            earlier = [s.value for s in DELIVERY_ORDER[:rank]]
+            for ids in _chunks([event.message_id for event in group], self.flush_size):
+                await db.execute(
+                    update(CampaignLog)
+                    .where(
+                        CampaignLog.message_id.in_(ids),
+                        CampaignLog.delivery_status.is_(None) | CampaignLog.delivery_status.in_(earlier),
+                    )
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+        return [event for event in latest.values() if event.message_id not in found]
+
+    async def _write_replies(self, db: AsyncSession, events: List[ReplyEvent]):
+        """
+        Marks contacts that answered a campaign message. Only contacts a
+        campaign sent to count (anyone else writing to the number is not a
+        campaign reply); they are found by their SENT recipient rows, which
+        outlive log retention. The contact keeps its latest reply time and
+        the latest log it was sent, if still there, keeps the first one.
+        """
+        if not events:
+            return
+        first_reply: Dict[str, datetime] = {}
+        last_reply: Dict[str, datetime] = {}
+        for event in events:
+            for phone in event.phones:
+                first_reply[phone] = min(first_reply.get(phone, event.received_at), event.received_at)
+                last_reply[phone] = max(last_reply.get(phone, event.received_at), event.received_at)
+
+        # (contact id, phone, latest SENT log id or None) for the contacts that were messaged
+        messaged = []
+        for phones in _chunks(list(first_reply), self.flush_size):
+            messaged += (await db.execute(
+                select(Contact.id, Contact.phone, func.max(CampaignLog.id).label("log_id"))
+                .join(CampaignRecipient, CampaignRecipient.contact_id == Contact.id)
+                .outerjoin(CampaignLog, and_(
+                    CampaignLog.campaign_id == CampaignRecipient.campaign_id,
+                    CampaignLog.contact_id == Contact.id,
+                    CampaignLog.status == RecipientStatus.SENT.value,
+                ))
+                .where(Contact.phone.in_(phones), CampaignRecipient.status == RecipientStatus.SENT.value)
+                .group_by(Contact.id, Contact.phone)
+            )).all()
+
+        for chunk in _chunks(messaged, self.flush_size):
+            # Each row gets its own reply time
+            await db.execute(
+                update(Contact)
+                .where(Contact.id.in_([row.id for row in chunk]))
+                .values(
+                    status=ContactStatus.REPLIED.value,
+                    replied_at=case({row.id: last_reply[row.phone] for row in chunk}, value=Contact.id),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            logged = [row for row in chunk if row.log_id is not None]
+            if not logged:
+                continue # logs already archived; the contact still counts as replied
+            await db.execute(
+                update(CampaignLog)
+                .where(CampaignLog.id.in_([row.log_id for row in logged]))
+                .values(replied_at=func.coalesce(
+                    CampaignLog.replied_at, case({row.log_id: first_reply[row.phone] for row in logged}, value=CampaignLog.id)
+                ))
+                .execution_options(synchronize_session=False)
+            )
+
+    async def close(self):
+        """Stops the periodic flush and writes whatever is left."""
+        if self._ticker is not None:
+            self._ticker.cancel()
+            try:
+                await self._ticker
+            except asyncio.CancelledError:
+                pass
+            self._ticker = None
+        if self._flush_task is not None:
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+
+
+webhook_buffer = WebhookEventBuffer()
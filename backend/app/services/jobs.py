@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class JobStatus:
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+    FINISHED = (SUCCEEDED, FAILED)
+
+
+@dataclass
+class Job:
+    """
+    In-process background job. Results are appended while the job runs so
+    readers can page or stream them before it finishes.
+    """
+    id: str
+    kind: str
+    status: str = JobStatus.PENDING
+    error: Optional[str] = None
+    progress: Dict[str, Any] = field(default_factory=dict)
+    results: List[Any] = field(default_factory=list)
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in JobStatus.FINISHED
+
+    def notify(self):
+        """Wakes up everyone waiting on this job."""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def add_results(self, items: List[Any]):
+        self.results.extend(items)
+        self.notify()
+
+    async def wait_for_change(self, timeout: Optional[float] = None):
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def follow(self, offset: int = 0):
+        """Yields results from `offset` on, waiting for new ones until the job finishes."""
+        while True:
+            while offset < len(self.results):
+                yield self.results[offset]
+                offset += 1
+            if self.finished:
+                return
+            await self.wait_for_change(timeout=15)
+
+
+class JobRegistry:
+    """Keeps recent jobs in memory and drops finished ones after JOB_TTL_SECONDS."""
+
+    def __init__(self, ttl_seconds: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds or settings.JOB_TTL_SECONDS
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _purge(self):
+        now = datetime.now(timezone.utc)
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at and (now - job.finished_at).total_seconds() > self.ttl_seconds
+        ]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+
+    def submit(self, kind: str, work: Callable[[Job], Awaitable[None]]) -> Job:
+        """Creates a job and runs `work(job)` as a task on the current event loop."""
+        self._purge()
+        job = Job(id=uuid.uuid4().hex, kind=kind)
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.create_task(self._run(job, work))
+        return job
+
+    async def _run(self, job: Job, work: Callable[[Job], Awaitable[None]]):
+        job.status = JobStatus.RUNNING
+        job.notify()
+        try:
+            await work(job)
+            job.status = JobStatus.SUCCEEDED
+        except Exception as e:
+            logger.error(f"{job.kind} job {job.id} failed: {e}")
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            self._tasks.pop(job.id, None)
+            job.notify()
+
+
+job_registry = JobRegistry()
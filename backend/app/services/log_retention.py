@@ -0,0 +1,167 @@
+import gzip
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.all_models import CampaignLog, CampaignLogDaily
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = (
+    "id", "campaign_id", "contact_id", "status", "error_message", "sent_at",
+    "message_id", "delivery_status", "delivered_at", "read_at", "replied_at",
+)
+
+
+@dataclass
+class RetentionResult:
+    deleted: int = 0
+    batches: int = 0
+    archive_path: Optional[str] = None
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes, which are UTC here
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _aggregate(rows) -> Dict[Tuple[int, Any, str], Dict[str, Any]]:
+    """{(campaign_id, UTC day, status): {count, first_sent_at, last_sent_at, delivered, read, replied}} for one batch."""
+    groups: Dict[Tuple[int, Any, str], Dict[str, Any]] = {}
+    for row in rows:
+        sent_at = _as_utc(row.sent_at)
+        group = groups.setdefault(
+            (row.campaign_id, sent_at.date(), row.status),
+            {"count": 0, "first_sent_at": sent_at, "last_sent_at": sent_at, "delivered": 0, "read": 0, "replied": 0},
+        )
+        group["count"] += 1
+        group["delivered"] += row.delivered_at is not None
+        group["read"] += row.read_at is not None
+        group["replied"] += row.replied_at is not None
+        group["first_sent_at"] = min(group["first_sent_at"], sent_at)
+        group["last_sent_at"] = max(group["last_sent_at"], sent_at)
+    return groups
+
+
+def _merge_rollups(db: Session, groups: Dict[Tuple[int, Any, str], Dict[str, Any]]):
+    """Adds a batch's counts to campaign_log_daily (one read, then updates and one insert). Does not commit."""
+    existing = {
+        (row.campaign_id, row.day, row.status): row
+        for row in db.execute(
+            select(CampaignLogDaily.id, CampaignLogDaily.campaign_id, CampaignLogDaily.day, CampaignLogDaily.status,
+                   CampaignLogDaily.first_sent_at, CampaignLogDaily.last_sent_at)
+            .where(
+                CampaignLogDaily.campaign_id.in_({key[0] for key in groups}),
+                CampaignLogDaily.day.in_({key[1] for key in groups}),
+            )
+        )
+    }
+    new_rows = []
+    for (campaign_id, day, status), group in groups.items():
+        row = existing.get((campaign_id, day, status))
+        if row is None:
+            new_rows.append({"campaign_id": campaign_id, "day": day, "status": status, **group})
+            continue
+        db.execute(
+            update(CampaignLogDaily)
+            .where(CampaignLogDaily.id == row.id)
+            .values(
+                count=CampaignLogDaily.count + group["count"],
+                delivered=func.coalesce(CampaignLogDaily.delivered, 0) + group["delivered"],
+                read=func.coalesce(CampaignLogDaily.read, 0) + group["read"],
+                replied=func.coalesce(CampaignLogDaily.replied, 0) + group["replied"],
+                first_sent_at=min(_as_utc(row.first_sent_at), group["first_sent_at"]),
+                last_sent_at=max(_as_utc(row.last_sent_at), group["last_sent_at"]),
+            )
+            .execution_options(synchronize_session=False)
+        )
+    if new_rows:
+        db.execute(insert(CampaignLogDaily.__table__), new_rows)
+
+
+def _archive_path(archive_dir: str) -> str:
+    os.makedirs(archive_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return os.path.join(archive_dir, f"campaign_logs-{stamp}.ndjson.gz")
+
+
+def apply_log_retention(
+    db: Session,
+    retention_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    archive_dir: Optional[str] = None,
+    pause_seconds: Optional[float] = None,
+) -> RetentionResult:
+    """
+    Moves campaign_logs rows older than `retention_days` out of the table,
+    oldest first, `batch_size` rows at a time. Each batch is appended to
+    one NDJSON.gz archive for the run, then its per campaign/day/status
+    counts are added to campaign_log_daily and the rows deleted by id in
+    the same short transaction, so rollups never count a row twice and no
+    lock is held for longer than one batch.
+
+    A crash between the archive write and the commit only means the batch
+    is archived again on the next run.
+    """
+    retention_days = settings.LOG_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = batch_size or settings.LOG_RETENTION_BATCH_SIZE
+    archive_dir = settings.LOG_ARCHIVE_DIR if archive_dir is None else archive_dir
+    pause_seconds = settings.LOG_RETENTION_BATCH_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+    result = RetentionResult()
+    if retention_days <= 0:
+        return result
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    archive = None
+    try:
+        while True:
+            rows = db.execute(
+                select(*[getattr(CampaignLog, name) for name in ARCHIVE_COLUMNS])
+                .where(CampaignLog.sent_at < cutoff)
+                .order_by(CampaignLog.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            if archive_dir:
+                if archive is None:
+                    result.archive_path = _archive_path(archive_dir)
+                    archive = gzip.open(result.archive_path, "wt", encoding="utf-8")
+                archive.writelines(
+                    json.dumps(dict(zip(ARCHIVE_COLUMNS, row)), default=str, ensure_ascii=False) + "\n" for row in rows
+                )
+                archive.flush()
+
+            _merge_rollups(db, _aggregate(rows))
+            db.execute(
+                delete(CampaignLog)
+                .where(CampaignLog.id.in_([row.id for row in rows]))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+            result.deleted += len(rows)
+            result.batches += 1
+            if len(rows) < batch_size:
+                break
+            if pause_seconds:
+                time.sleep(pause_seconds)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if archive is not None:
+            archive.close()
+
+    logger.info(f"Log retention: {result.deleted} logs older than {retention_days} days rolled up and deleted in {result.batches} batches (archive: {result.archive_path})")
+    return result
@@ -0,0 +1,137 @@
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.all_models import SearchCacheEntry
+from app.schemas.all_schemas import ContactCreate
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def cache_key(query: str, limit: int) -> str:
+    return f"{limit}:{query.strip().lower()}"
+
+
+class SearchCache:
+    """
+    Database-backed cache of Apify results per expanded query, with a TTL
+    and an LRU bound on the number of entries. Hit/miss counters are kept
+    per process; the per-entry `hits` column survives restarts.
+    """
+
+    def __init__(self, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds or settings.SEARCH_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or settings.SEARCH_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh_after(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+
+    def get_many(self, db: Session, queries: List[str], limit: int) -> Dict[str, List[ContactCreate]]:
+        """
+        Returns the fresh cached results for the queries that have them,
+        keyed by query. Queries differing only in case share one entry.
+        """
+        keys: Dict[str, List[str]] = {}
+        for q in queries:
+            keys.setdefault(cache_key(q, limit), []).append(q)
+        rows = db.execute(
+            select(SearchCacheEntry.id, SearchCacheEntry.cache_key, SearchCacheEntry.items)
+            .where(SearchCacheEntry.cache_key.in_(keys), SearchCacheEntry.created_at >= self._fresh_after())
+        ).all()
+
+        found = {}
+        for row in rows:
+            items = [ContactCreate(**item) for item in json.loads(row.items)]
+            found.update((q, items) for q in keys[row.cache_key])
+        self.hits += len(rows)
+        self.misses += len(keys) - len(rows)
+
+        if rows:
+            db.execute(
+                update(SearchCacheEntry)
+                .where(SearchCacheEntry.id.in_([row.id for row in rows]))
+                .values(hits=SearchCacheEntry.hits + 1, last_accessed_at=datetime.now(timezone.utc))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        return found
+
+    def put_many(self, db: Session, limit: int, results: Dict[str, List[ContactCreate]]):
+        """
+        Stores (or replaces) the results of each query, then enforces TTL and
+        size. An upsert on cache_key, so two searches finishing with the same
+        query at once both succeed (the last one wins). Queries differing
+        only in case are stored once.
+        """
+        if not results:
+            return
+        # One row per key: a multi-row upsert cannot touch the same key twice
+        rows = list({
+            cache_key(query, limit): {
+                "cache_key": cache_key(query, limit),
+                "query": query,
+                "result_limit": limit,
+                "items": json.dumps([c.model_dump() for c in contacts]),
+                "hits": 0,
+            }
+            for query, contacts in results.items()
+        }.values())
+        upsert = _UPSERT_INSERTS.get(db.bind.dialect.name)
+        if upsert is not None:
+            stmt = upsert(SearchCacheEntry).values(rows)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["cache_key"],
+                set_={
+                    "query": stmt.excluded["query"],
+                    "items": stmt.excluded["items"],
+                    "hits": 0,
+                    "created_at": func.now(),
+                    "last_accessed_at": func.now(),
+                },
+            ))
+        else:
+            db.execute(delete(SearchCacheEntry).where(SearchCacheEntry.cache_key.in_([row["cache_key"] for row in rows])))
+            db.execute(insert(SearchCacheEntry.__table__), rows)
+        db.commit()
+        self.evict(db)
+
+    def evict(self, db: Session):
+        db.execute(delete(SearchCacheEntry).where(SearchCacheEntry.created_at < self._fresh_after()))
+        count = db.execute(select(func.count(SearchCacheEntry.id))).scalar()
+        if count > self.max_entries:
+            oldest = (
+                select(SearchCacheEntry.id)
+                .order_by(SearchCacheEntry.last_accessed_at, SearchCacheEntry.id)
+                .limit(count - self.max_entries)
+            )
+            db.execute(delete(SearchCacheEntry).where(SearchCacheEntry.id.in_(oldest)))
+        db.commit()
+
+    def clear(self, db: Session):
+        db.execute(delete(SearchCacheEntry))
+        db.commit()
+        self.hits = self.misses = 0
+
+    def stats(self, db: Session) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": db.execute(select(func.count(SearchCacheEntry.id))).scalar(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+search_cache = SearchCache()
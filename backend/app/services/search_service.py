@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.schemas.all_schemas import ContactCreate
+from app.services.apify_service import apify_service, build_search_queries
+from app.services.search_cache import cache_key, search_cache
+from app.utils.dedupe import DedupeIndex, business_keys
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _cache_lookup(queries: List[str], limit: int) -> Dict[str, List[ContactCreate]]:
+    db = SessionLocal()
+    try:
+        return search_cache.get_many(db, queries, limit)
+    finally:
+        db.close()
+
+
+def _cache_store(limit: int, results: Dict[str, List[ContactCreate]]):
+    db = SessionLocal()
+    try:
+        search_cache.put_many(db, limit, results)
+    except SQLAlchemyError as e:
+        # The cache is best effort: the results were already returned
+        db.rollback()
+        logger.warning(f"Failed to cache {len(results)} search queries: {e}")
+    finally:
+        db.close()
+
+
+def _first_sighting(seen: DedupeIndex, contact: ContactCreate) -> bool:
+    if not settings.CONTACTS_DEDUPE_BY_BUSINESS:
+        return seen.add(business_keys(contact.phone, None, None))
+    return seen.add_contact(contact.phone, contact.name, contact.address, contact.google_maps_link)
+
+
+async def stream_search(
+    terms: List[str], locations: List[str], limit: int = 50, progress: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[ContactCreate]:
+    """
+    Yields contacts for every term x location query, deduplicated by phone
+    and by business (Maps place id, normalized name + address), so
+    overlapping queries collapse in one pass.
+    Queries seen within the cache TTL are served from the cache; only the
+    remaining ones go to Apify as concurrent sharded runs, merged as they
+    stream in; each query is cached unless its shard failed or its places came back
+    without their search string.
+    `progress` (optional) gets the query and shard counts.
+    """
+    # Case variants of a query are the same Maps search (and the same cache entry)
+    unique: Dict[str, str] = {}
+    for query in build_search_queries(terms, locations):
+        unique.setdefault(cache_key(query, limit), query)
+    queries = list(unique.values())
+    cached = await asyncio.to_thread(_cache_lookup, queries, limit) if settings.SEARCH_CACHE_ENABLED else {}
+    missing = [q for q in queries if q not in cached]
+    logger.info(f"Search: {len(cached)} queries cached, {len(missing)} to scrape")
+    progress = {} if progress is None else progress
+    progress.update(queries=len(queries), cached=len(cached))
+
+    seen = DedupeIndex()
+    for query in queries:
+        for contact in cached.get(query, []):
+            if _first_sighting(seen, contact):
+                yield contact
+
+    if not missing:
+        return
+
+    fresh: Dict[str, List[ContactCreate]] = defaultdict(list)
+    scraped = set(missing)
+    async for query, contact in apify_service.stream_shards(missing, limit, progress):
+        if query in scraped:
+            fresh[query].append(contact)
+        if _first_sighting(seen, contact):
+            yield contact
+
+    if settings.SEARCH_CACHE_ENABLED:
+        # A query that legitimately returned nothing is cached as empty too; a
+        # query whose places could not be attributed to it is not cached at all
+        skip = set(progress.get("failed_queries", ())) | set(progress.get("untagged_queries", ()))
+        await asyncio.to_thread(_cache_store, limit, {q: fresh.get(q, []) for q in missing if q not in skip})
+
+
+async def search(terms: List[str], locations: List[str], limit: int = 50) -> List[ContactCreate]:
+    return [contact async for contact in stream_search(terms, locations, limit)]
@@ -0,0 +1,104 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.all_models import WhatsAppNumberCheck
+from app.services.evolution_service import EvolutionService, evolution_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# error_message of recipients skipped by the pre-check
+NOT_ON_WHATSAPP = "NOT_ON_WHATSAPP"
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+class WhatsAppNumberChecker:
+    """
+    Pre-flight check of campaign numbers against WhatsApp.
+
+    Answers are cached in whatsapp_number_checks for `ttl_seconds`, so a
+    number is asked about at most once per TTL however many campaigns it
+    is in. Numbers Evolution did not answer for (or a failed call) are
+    treated as unknown and still sent to.
+    """
+
+    def __init__(
+        self,
+        service: Optional[EvolutionService] = None,
+        ttl_seconds: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.service = service or evolution_service
+        self.ttl_seconds = ttl_seconds or settings.WHATSAPP_CHECK_TTL_SECONDS
+        self.batch_size = batch_size or settings.WHATSAPP_CHECK_BATCH_SIZE
+
+    def _fresh_after(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+
+    async def cached(self, db: AsyncSession, phones: List[str]) -> Dict[str, bool]:
+        rows = (await db.execute(
+            select(WhatsAppNumberCheck.phone, WhatsAppNumberCheck.on_whatsapp)
+            .where(WhatsAppNumberCheck.phone.in_(phones), WhatsAppNumberCheck.checked_at >= self._fresh_after())
+        )).all()
+        return {row.phone: row.on_whatsapp for row in rows}
+
+    async def _store(self, db: AsyncSession, answers: Dict[str, Optional[str]]):
+        """
+        An upsert on phone, so two workers checking the same numbers at
+        once both succeed (the last answer wins).
+        """
+        if not answers:
+            return
+        now = datetime.now(timezone.utc)
+        rows = [
+            {"phone": phone, "on_whatsapp": jid is not None, "jid": jid, "checked_at": now}
+            for phone, jid in answers.items()
+        ]
+        upsert = _UPSERT_INSERTS.get(db.bind.dialect.name)
+        if upsert is not None:
+            stmt = upsert(WhatsAppNumberCheck.__table__)
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=["phone"],
+                set_={
+                    "on_whatsapp": stmt.excluded["on_whatsapp"],
+                    "jid": stmt.excluded["jid"],
+                    "checked_at": stmt.excluded["checked_at"],
+                },
+            ), rows)
+        else:
+            await db.execute(delete(WhatsAppNumberCheck).where(WhatsAppNumberCheck.phone.in_(list(answers))))
+            # Core table insert keeps this one executemany (the ORM path splits on NULL jids)
+            await db.execute(insert(WhatsAppNumberCheck.__table__), rows)
+        await db.commit()
+
+    async def check(self, db: AsyncSession, phones: List[str], instance: Optional[str] = None) -> Dict[str, bool]:
+        """{phone: on WhatsApp?} for the numbers with a known answer, cached or fresh."""
+        phones = list(dict.fromkeys(phones))
+        known = await self.cached(db, phones)
+        unknown = [phone for phone in phones if phone not in known]
+
+        for start in range(0, len(unknown), self.batch_size):
+            chunk = unknown[start:start + self.batch_size]
+            try:
+                answers = await self.service.check_whatsapp_numbers(chunk, instance=instance)
+            except Exception as e:
+                logger.warning(f"WhatsApp number check failed for {len(chunk)} numbers, sending anyway: {e}")
+                continue
+            await self._store(db, answers)
+            known.update({phone: jid is not None for phone, jid in answers.items()})
+        return known
+
+    async def unreachable(self, db: AsyncSession, phones: List[str], instance: Optional[str] = None) -> Set[str]:
+        """The numbers known not to be on WhatsApp."""
+        return {phone for phone, on_whatsapp in (await self.check(db, phones, instance)).items() if not on_whatsapp}
+
+
+whatsapp_checker = WhatsAppNumberChecker()
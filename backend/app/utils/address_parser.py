@@ -0,0 +1,26 @@
+from typing import Optional
+
+# Brazilian state codes (UF)
+STATES = {
+    "AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", "MA", "MT", "MS", "MG", "PA",
+    "PB", "PR", "PE", "PI", "RJ", "RN", "RS", "RO", "RR", "SC", "SP", "SE", "TO",
+}
+
+
+def extract_city(address: Optional[str]) -> Optional[str]:
+    """
+    Extracts the city from a Google Maps address.
+    e.g. "R. Barão de Jaguara, 1000 - Centro, Campinas - SP, 13015-001, Brasil" -> "Campinas"
+    Also understands "Campinas - State of São Paulo" (English locale). Returns None if not found.
+    """
+    if not address:
+        return None
+
+    # The city is the last comma-separated part shaped like "<city> - <UF>"
+    for part in reversed(address.split(",")):
+        city, sep, state = part.strip().rpartition(" - ")
+        if not sep or not city:
+            continue
+        if state.strip() in STATES or state.strip().startswith("State of"):
+            return city.strip()
+    return None
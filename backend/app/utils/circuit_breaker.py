@@ -0,0 +1,42 @@
+import time
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a dependency that keeps failing.
+
+    CLOSED: calls go through; `failure_threshold` failures in a row open it.
+    OPEN: calls are refused for `reset_timeout` seconds.
+    HALF_OPEN: after the timeout the caller should probe the dependency
+    and report back with record_success() or trip().
+    """
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> bool:
+        """Counts a failure. Returns True once the threshold is reached."""
+        self.failures += 1
+        return self.failures >= self.failure_threshold
+
+    def trip(self):
+        self.opened_at = time.monotonic()
@@ -0,0 +1,105 @@
+import hashlib
+import re
+import unicodedata
+from typing import Iterable, Optional, Set
+from urllib.parse import parse_qs, unquote, urlparse
+
+_PLACE_ID = re.compile(r'ChIJ[A-Za-z0-9_-]{10,}')
+# Feature id in /maps/place/... links: "0x<hex>:0x<cid hex>"
+_FEATURE_ID = re.compile(r'0x[0-9a-fA-F]+:0x([0-9a-fA-F]+)')
+_CEP = re.compile(r'\b\d{5}-?\d{3}\b')
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# Google Maps writes street types abbreviated or not depending on the listing
+_ABBREVIATIONS = {
+    "r": "rua", "av": "avenida", "al": "alameda", "pc": "praca", "pca": "praca",
+    "rod": "rodovia", "estr": "estrada", "trav": "travessa", "tv": "travessa",
+}
+_ADDRESS_NOISE = {"brasil", "brazil"}
+_NAME_NOISE = {"ltda", "me", "epp", "eireli", "sa"}
+
+
+def extract_place_id(link: Optional[str]) -> Optional[str]:
+    """
+    Stable Google Maps id of a place, from its link.
+    e.g. ".../maps/search/?api=1&query=X&query_place_id=ChIJN1t_tDeuEmsRUsoyG83frY4" -> "ChIJN1t_tDeuEmsRUsoyG83frY4"
+    Links without a place id fall back to the numeric CID ("cid:<n>", from
+    ?cid= or the feature id of /maps/place/ links). Returns None if neither is found.
+    """
+    if not link:
+        return None
+    link = unquote(link)
+    params = parse_qs(urlparse(link).query)
+    for name in ("query_place_id", "place_id"):
+        if params.get(name):
+            return params[name][0]
+    match = _PLACE_ID.search(link)
+    if match:
+        return match.group(0)
+    if params.get("cid") and params["cid"][0].isdigit():
+        return f"cid:{params['cid'][0]}"
+    match = _FEATURE_ID.search(link)
+    if match:
+        return f"cid:{int(match.group(1), 16)}"
+    return None
+
+
+def _tokens(value: str) -> list:
+    value = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode().lower()
+    return _NON_ALNUM.sub(" ", value).split()
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lowercase, no accents or punctuation, without company suffixes (Ltda, ME...)."""
+    return " ".join(t for t in _tokens(name or "") if t not in _NAME_NOISE)
+
+
+def normalize_address(address: Optional[str]) -> str:
+    """Lowercase, no accents, punctuation, CEP or country, street types spelled out."""
+    tokens = _tokens(_CEP.sub(" ", address or ""))
+    return " ".join(_ABBREVIATIONS.get(t, t) for t in tokens if t not in _ADDRESS_NOISE)
+
+
+def name_address_key(name: Optional[str], address: Optional[str]) -> Optional[str]:
+    """
+    Short hash of the normalized name + address, stored in Contact.dedupe_key.
+    None when either is missing: a name alone would merge branches of a chain.
+    """
+    name, address = normalize_name(name), normalize_address(address)
+    if not name or not address:
+        return None
+    return hashlib.blake2b(f"{name}|{address}".encode(), digest_size=10).hexdigest()
+
+
+def business_keys(phone: Optional[str], place_id: Optional[str], dedupe_key: Optional[str]) -> list:
+    """Every key one contact is known by, prefixed by kind so they never collide."""
+    keys = []
+    if phone:
+        keys.append(f"phone:{phone}")
+    if place_id:
+        keys.append(f"place:{place_id}")
+    if dedupe_key:
+        keys.append(f"name:{dedupe_key}")
+    return keys
+
+
+class DedupeIndex:
+    """
+    Set of business keys seen so far. A contact is a duplicate when any of
+    its keys was seen before; all its keys are recorded either way, so a
+    place reached under two phones and then a third link still collapses.
+    One set lookup per key, O(n) over a merge.
+    """
+
+    def __init__(self):
+        self._seen: Set[str] = set()
+
+    def add(self, keys: Iterable[str]) -> bool:
+        """Records the keys. Returns False if the contact was already seen."""
+        keys = list(keys)
+        new = not any(key in self._seen for key in keys)
+        self._seen.update(keys)
+        return new
+
+    def add_contact(self, phone: Optional[str], name: Optional[str], address: Optional[str], link: Optional[str]) -> bool:
+        return self.add(business_keys(phone, extract_place_id(link), name_address_key(name, address)))
@@ -0,0 +1,15 @@
+import base64
+from fastapi import HTTPException
+
+
+def encode_cursor(row_id: int) -> str:
+    """Opaque keyset cursor pointing at the last row of a page."""
+    return base64.urlsafe_b64encode(str(row_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -1,4 +1,31 @@
 import re
+import enum
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple
+
+_NON_DIGITS = re.compile(r'\D')
+
+# Brazilian area codes (DDD) in use
+VALID_DDDS = frozenset({
+    11, 12, 13, 14, 15, 16, 17, 18, 19,
+    21, 22, 24, 27, 28,
+    31, 32, 33, 34, 35, 37, 38,
+    41, 42, 43, 44, 45, 46, 47, 48, 49,
+    51, 53, 54, 55,
+    61, 62, 63, 64, 65, 66, 67, 68, 69,
+    71, 73, 74, 75, 77, 79,
+    81, 82, 83, 84, 85, 86, 87, 88, 89,
+    91, 92, 93, 94, 95, 96, 97, 98, 99,
+})
+
+class PhoneType(str, enum.Enum):
+    MOBILE = "MOBILE"
+    LANDLINE = "LANDLINE"
+    INVALID = "INVALID"
+
+class PhoneInfo(NamedTuple):
+    phone: str # normalized, e.g. 5511999999999
+    type: PhoneType
 
 def normalize_phone(phone: str, default_country_code: str = "55") -> str:
     """
@@ -10,7 +37,7 @@ def normalize_phone(phone: str, default_country_code: str = "55") -> str:
         return ""
     
     # Remove everything except digits
-    cleaned = re.sub(r'\D', '', phone)
+    cleaned = _NON_DIGITS.sub('', phone)
     
     if not cleaned:
         return ""
@@ -28,3 +55,40 @@ def normalize_phone(phone: str, default_country_code: str = "55") -> str:
     # This is a simplification, but sufficient for the specified scope.
     
     return cleaned
+
+@lru_cache(maxsize=200_000)
+def classify_phone(phone: str) -> PhoneInfo:
+    """
+    Normalizes and validates a Brazilian number (DDD + mobile/landline prefix rules).
+    Mobiles have 9 digits starting with 9; landlines 8 digits starting with 2-5.
+    Old 8-digit mobiles (6-9) get the leading 9 added. Anything else,
+    including non-Brazilian numbers, is INVALID.
+    Cached, since the same numbers come back across overlapping searches.
+    """
+    normalized = normalize_phone(phone)
+    if not normalized.startswith("55") or len(normalized) not in (12, 13):
+        return PhoneInfo(normalized, PhoneType.INVALID)
+
+    ddd, subscriber = normalized[2:4], normalized[4:]
+    if int(ddd) not in VALID_DDDS:
+        return PhoneInfo(normalized, PhoneType.INVALID)
+
+    first = subscriber[0]
+    if len(subscriber) == 9:
+        return PhoneInfo(normalized, PhoneType.MOBILE if first == "9" else PhoneType.INVALID)
+    if first in "2345":
+        return PhoneInfo(normalized, PhoneType.LANDLINE)
+    if first in "6789":
+        return PhoneInfo(f"55{ddd}9{subscriber}", PhoneType.MOBILE)
+    return PhoneInfo(normalized, PhoneType.INVALID)
+
+_EMPTY = PhoneInfo("", PhoneType.INVALID)
+
+def normalize_phones(phones: Iterable[str]) -> List[PhoneInfo]:
+    """
+    Batch version of classify_phone: each distinct number in the batch is
+    classified once, then results are mapped back in input order.
+    """
+    phones = list(phones)
+    memo = {phone: classify_phone(phone) if phone else _EMPTY for phone in dict.fromkeys(phones)}
+    return list(map(memo.__getitem__, phones))
@@ -0,0 +1,28 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> List[str]:
+    """
+    `?fields=id,name` -> ["id", "name"], in the order of `allowed`.
+    No value means every field. Unknown names are a 400.
+    """
+    if not fields:
+        return list(allowed)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}")
+    return [name for name in allowed if name in requested]
+
+
+def rows_response(rows: Iterable[Any], fields: Sequence[str], headers: Optional[Dict[str, str]] = None) -> ORJSONResponse:
+    """
+    Serializes column rows straight with orjson: no ORM objects and no
+    pydantic validation on the way out (the route's response_model still
+    documents the shape).
+    """
+    content = [{name: row[name] for name in fields} for row in rows]
+    return ORJSONResponse(content, headers=headers)
@@ -0,0 +1,63 @@
+import re
+from datetime import datetime, time
+from functools import lru_cache
+from typing import FrozenSet, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+_WINDOW = re.compile(r'^([01]\d|2[0-3]):([0-5]\d)-([01]\d|2[0-3]):([0-5]\d)$')
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+# Day names by their first three letters, in English and Portuguese ("seg", "terça", "sábado"...)
+_DAY_NUMBERS = {
+    **{day: number for number, day in enumerate(WEEKDAYS)},
+    "seg": 0, "ter": 1, "qua": 2, "qui": 3, "sex": 4, "sab": 5, "sáb": 5, "dom": 6,
+}
+
+
+def validate_window(window: str) -> str:
+    """Accepts "HH:MM-HH:MM" (local time, end exclusive). Raises ValueError otherwise."""
+    if not _WINDOW.match(window.strip()):
+        raise ValueError('send window must look like "08:00-20:00"')
+    return window.strip()
+
+
+def validate_weekdays(weekdays: str) -> str:
+    """Accepts a comma-separated list of day names ("mon,tue" or "seg,ter"). Raises ValueError on unknown names."""
+    _parse_weekdays(weekdays)
+    return weekdays.strip()
+
+
+@lru_cache(maxsize=64)
+def _parse_window(window: str) -> Tuple[time, time]:
+    hour_start, minute_start, hour_end, minute_end = map(int, _WINDOW.match(validate_window(window)).groups())
+    return time(hour_start, minute_start), time(hour_end, minute_end)
+
+
+@lru_cache(maxsize=16)
+def _parse_weekdays(weekdays: str) -> FrozenSet[int]:
+    names = [day.strip().lower() for day in weekdays.split(",") if day.strip()]
+    unknown = [name for name in names if name[:3] not in _DAY_NUMBERS]
+    if unknown:
+        raise ValueError(f"unknown weekday(s) {', '.join(unknown)}; use mon,tue,wed,thu,fri,sat,sun or seg,ter,qua,qui,sex,sab,dom")
+    return frozenset(_DAY_NUMBERS[name[:3]] for name in names)
+
+
+def in_send_window(now: datetime, window: Optional[str], weekdays: str, tz: str) -> bool:
+    """
+    Whether `now` (aware) falls inside the allowed sending hours, evaluated
+    in `tz`. A window whose end is before its start wraps past midnight
+    ("22:00-02:00"); the weekday is the one the window started on. An empty
+    window or weekday list means no restriction.
+    """
+    local = now.astimezone(ZoneInfo(tz))
+    days = _parse_weekdays(weekdays) if weekdays else frozenset(range(7))
+    if not window:
+        return local.weekday() in days
+
+    start, end = _parse_window(window)
+    current = local.time()
+    if start <= end:
+        return start <= current < end and local.weekday() in days
+    if current >= start:
+        return local.weekday() in days
+    # After midnight, still inside yesterday's window
+    return current < end and (local.weekday() - 1) % 7 in days
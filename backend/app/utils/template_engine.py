@@ -0,0 +1,70 @@
+import string
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from app.utils.address_parser import extract_city
+
+# Placeholders a template may use, e.g. "Olá {nome}, vi sua empresa em {cidade}!"
+PLACEHOLDERS = ("nome", "cidade", "categoria", "endereco", "telefone")
+
+
+class TemplateError(ValueError):
+    """Template content cannot be compiled (bad braces or unknown placeholder)."""
+
+
+class CompiledTemplate:
+    """
+    A template parsed once into (literal, placeholder) pairs.
+    Rendering is a plain join, no re-parsing per contact.
+    """
+
+    def __init__(self, parts: Tuple[Tuple[str, Optional[str]], ...]):
+        self.parts = parts
+        self.placeholders: FrozenSet[str] = frozenset(field for _, field in parts if field)
+
+    def render(self, values: Mapping[str, str]) -> str:
+        return "".join(literal + ((values.get(field) or "") if field else "") for literal, field in self.parts)
+
+    def render_many(self, rows: Iterable[Mapping[str, str]]) -> List[str]:
+        return [self.render(values) for values in rows]
+
+
+@lru_cache(maxsize=256)
+def compile_template(content: str) -> CompiledTemplate:
+    """
+    Parses and validates a template. Cached by content, so each distinct
+    template is parsed once per process. Literal braces are written {{ and }}.
+    """
+    try:
+        parsed = list(string.Formatter().parse(content))
+    except ValueError as e:
+        raise TemplateError(f"Invalid template: {e}. Use {{{{ and }}}} for literal braces.")
+
+    parts = []
+    for literal, field, spec, conversion in parsed:
+        if field is None:
+            parts.append((literal, None))
+            continue
+        if field not in PLACEHOLDERS:
+            allowed = ", ".join("{" + p + "}" for p in PLACEHOLDERS)
+            raise TemplateError(f"Unknown placeholder {{{field}}}. Allowed: {allowed}")
+        if spec or conversion:
+            raise TemplateError(f"Placeholder {{{field}}} cannot have a format spec or conversion")
+        parts.append((literal, field))
+    return CompiledTemplate(tuple(parts))
+
+
+def contact_values(
+    name: Optional[str],
+    address: Optional[str],
+    category: Optional[str],
+    phone: Optional[str] = None,
+) -> Dict[str, str]:
+    """Placeholder values for one contact."""
+    return {
+        "nome": name or "",
+        "cidade": extract_city(address) or "",
+        "categoria": category or "",
+        "endereco": address or "",
+        "telefone": phone or "",
+    }
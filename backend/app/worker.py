@@ -0,0 +1,230 @@
+"""
+Campaign dispatch worker.
+
+Runs as its own process (python -m app.worker), separate from the API.
+Several workers can run at once: each one leases recipients from the
+campaign_recipients table, sends them and records the result, so a
+restart only loses the lease of the batch that was in flight.
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal, async_engine, init_db
+from app.core.metrics import CAMPAIGN_MESSAGES, start_worker_metrics_server
+from app.models.all_models import Campaign, RecipientStatus, Template
+from app.services.campaign_queue import (
+    ClaimedRecipient,
+    FairShare,
+    claim_batch,
+    release_recipients,
+    finalize_campaigns,
+    PAUSED_DISCONNECTED,
+    pause_active_campaigns,
+    resume_paused_campaigns,
+    has_campaigns_in_status,
+)
+from app.services.campaign_events import campaign_events
+from app.services.campaign_write_buffer import CampaignWriteBuffer, SendOutcome
+from app.services.evolution_pool import InstancesUnavailableError, SendCancelledError, build_instance_pool
+from app.services.evolution_service import SendErrorCode, evolution_service
+from app.services.whatsapp_check import NOT_ON_WHATSAPP, whatsapp_checker
+from app.utils.template_engine import CompiledTemplate, TemplateError, compile_template, contact_values
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class CampaignWorker:
+    def __init__(self, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._stopping = asyncio.Event()
+        self._disconnected = False
+        self._templates: Dict[int, Optional[str]] = {}
+        self.fair_share = FairShare()
+        self.pool = build_instance_pool()
+        self.buffer = CampaignWriteBuffer(AsyncSessionLocal)
+
+    def stop(self):
+        logger.info(f"Worker {self.worker_id} stopping after the sends already in flight")
+        self._stopping.set()
+
+    async def _load_templates(self, db, campaign_ids):
+        missing = set(campaign_ids) - self._templates.keys()
+        if not missing:
+            return
+        rows = (await db.execute(
+            select(Campaign.id, Template.content)
+            .outerjoin(Template, Template.id == Campaign.template_id)
+            .where(Campaign.id.in_(missing))
+        )).all()
+        self._templates.update({row.id: row.content for row in rows})
+
+    def _template_for(self, campaign_id: int) -> CompiledTemplate:
+        """
+        Compiled template of a campaign. Raises TemplateError for invalid
+        legacy templates and for a missing or empty one (rather than
+        sending an empty message to everyone).
+        """
+        content = self._templates.get(campaign_id)
+        if not content or not content.strip():
+            raise TemplateError("Campaign template is missing or empty")
+        return compile_template(content)
+
+    async def _process(self, recipient: ClaimedRecipient, pending: List[int]):
+        if self._stopping.is_set():
+            return # left in `pending`, released back to the queue
+        try:
+            message = self._template_for(recipient.campaign_id).render(
+                contact_values(recipient.name, recipient.address, recipient.category, recipient.phone)
+            )
+            # Pacing, retries and the per-instance circuit breakers live in the pool
+            result, _ = await self.pool.send_text(
+                phone=recipient.phone,
+                message=message,
+                stop=self._stopping,
+            )
+        except TemplateError as e:
+            await self._record(recipient, RecipientStatus.ERROR, str(e), pending)
+            return
+        except InstancesUnavailableError:
+            self._disconnected = True
+            return # left in `pending`, released back to the queue
+        except SendCancelledError:
+            return # stopped while waiting for its turn; released back to the queue
+
+        if result.success:
+            await self._record(recipient, RecipientStatus.SENT, None, pending, message_id=result.message_id)
+        elif result.error_code == SendErrorCode.INSTANCE_DISCONNECTED:
+            # Not the recipient's fault: it goes back to the queue for when the instance is back
+            if not await self.pool.healthy():
+                self._disconnected = True
+        else:
+            await self._record(recipient, RecipientStatus.ERROR, result.describe(), pending)
+
+    async def _record(
+        self,
+        recipient: ClaimedRecipient,
+        status: RecipientStatus,
+        error_message: Optional[str],
+        pending: List[int],
+        message_id: Optional[str] = None,
+    ):
+        # Written in batches; the row stays leased until the buffer flushes it
+        await self.buffer.add(SendOutcome(
+            recipient_id=recipient.id,
+            campaign_id=recipient.campaign_id,
+            contact_id=recipient.contact_id,
+            status=status,
+            error_message=error_message,
+            message_id=message_id
+        ))
+        pending.remove(recipient.id)
+        CAMPAIGN_MESSAGES.labels(status.value).inc()
+        campaign_events.publish(recipient.campaign_id, {
+            "type": "message",
+            "contact_id": recipient.contact_id,
+            "status": status.value,
+            "error_message": error_message,
+        })
+
+    async def _precheck(self, db, batch: List[ClaimedRecipient], pending: List[int]) -> List[ClaimedRecipient]:
+        """Skips recipients whose number is known not to be on WhatsApp; returns the rest."""
+        if not settings.WHATSAPP_CHECK_ENABLED:
+            return batch
+        unreachable = await whatsapp_checker.unreachable(db, [r.phone for r in batch])
+        sendable = []
+        for recipient in batch:
+            if recipient.phone in unreachable:
+                await self._record(recipient, RecipientStatus.SKIPPED, NOT_ON_WHATSAPP, pending)
+            else:
+                sendable.append(recipient)
+        return sendable
+
+    async def _resume_if_reconnected(self, db):
+        if await has_campaigns_in_status(db, PAUSED_DISCONNECTED) and await self.pool.healthy():
+            resumed = await resume_paused_campaigns(db)
+            logger.info(f"Evolution reconnected, resumed {resumed} campaign(s)")
+
+    async def _wait(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self):
+        logger.info(f"Campaign worker {self.worker_id} started")
+        self.buffer.start()
+        try:
+            await self._loop()
+        finally:
+            await self.buffer.close()
+        logger.info(f"Campaign worker {self.worker_id} stopped")
+
+    async def _loop(self):
+        while not self._stopping.is_set():
+            pending: List[int] = []
+            async with AsyncSessionLocal() as db:
+                try:
+                    batch = await claim_batch(db, self.worker_id, share=self.fair_share)
+                    if not batch:
+                        await self.buffer.flush()
+                        await finalize_campaigns(db)
+                        await self._resume_if_reconnected(db)
+                        self._templates.clear()
+                        await self._wait(settings.CAMPAIGN_WORKER_POLL_INTERVAL)
+                        continue
+
+                    # The pool bounds how many sends are in flight
+                    pending = [r.id for r in batch]
+                    batch = await self._precheck(db, batch, pending)
+                    await self._load_templates(db, {r.campaign_id for r in batch})
+                    # Do not sit in an open transaction while the sends are paced
+                    await db.commit()
+                    # Sends run concurrently and do not touch the session
+                    await asyncio.gather(*(self._process(recipient, pending) for recipient in batch))
+                    if self._disconnected:
+                        # Rather than burning through the list with every send failing
+                        paused = await pause_active_campaigns(db)
+                        logger.warning(f"No Evolution instance connected, paused {paused} campaign(s)")
+                        self._disconnected = False
+                except Exception as e:
+                    logger.error(f"Worker {self.worker_id} failed processing batch: {e}")
+                    await db.rollback()
+                    await self._wait(settings.CAMPAIGN_WORKER_POLL_INTERVAL)
+                finally:
+                    # Unsent rows go back to the queue right away instead of waiting for the lease
+                    await release_recipients(db, pending, self.worker_id)
+
+
+async def run_worker():
+    worker = CampaignWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            # Windows event loops do not support signal handlers
+            pass
+    try:
+        await worker.run()
+    finally:
+        await evolution_service.aclose()
+        await async_engine.dispose()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    init_db()
+    start_worker_metrics_server()
+    asyncio.run(run_worker())
+
+
+if __name__ == "__main__":
+    main()
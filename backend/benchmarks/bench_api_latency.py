@@ -0,0 +1,129 @@
+"""
+API latency with and without a campaign running in the same process.
+
+Starts the API under uvicorn with the embedded campaign worker, sending
+to the mock Evolution server, and hammers the hot read endpoints
+(contact list, campaign logs, campaign stats) first while idle, then
+while a campaign is being dispatched. With the async session the
+worker's database work no longer blocks the event loop, so p99 should
+stay close to the idle figure.
+
+    cd backend && python -m benchmarks.bench_api_latency [contacts] [requests]
+
+Uses a throwaway SQLite database unless BENCH_DATABASE_URL is set.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.mock_servers import BackgroundServer, evolution_app
+
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "10"))
+ENDPOINTS = [
+    "/api/v1/contacts/?limit=50",
+    "/api/v1/campaigns/logs?limit=50",
+    "/api/v1/campaigns/{campaign_id}/stats",
+]
+
+
+def _configure(evolution_url: str):
+    """Settings are read at import time, so this runs before the app is imported."""
+    database_url = os.getenv("BENCH_DATABASE_URL")
+    if not database_url:
+        database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    os.environ.update(
+        DATABASE_URL=database_url,
+        EVOLUTION_API_URL=evolution_url,
+        CAMPAIGN_WORKER_EMBEDDED="true",
+        CAMPAIGN_WORKER_POLL_INTERVAL="0.2",
+        EVOLUTION_RATE_PER_MINUTE=os.getenv("BENCH_RATE_PER_MINUTE", "6000"),
+        EVOLUTION_RATE_BURST="10",
+        EVOLUTION_SEND_CONCURRENCY="8",
+        EVOLUTION_SEND_JITTER_SECONDS="0",
+    )
+
+
+def _percentile(samples, q: float) -> float:
+    return samples[max(0, int(len(samples) * q) - 1)]
+
+
+def _report(label: str, samples):
+    samples = sorted(samples)
+    print(
+        f"{label:<18} n={len(samples):<6} mean={statistics.mean(samples):7.2f} ms  "
+        f"p50={_percentile(samples, 0.50):7.2f} ms  p95={_percentile(samples, 0.95):7.2f} ms  "
+        f"p99={_percentile(samples, 0.99):7.2f} ms"
+    )
+
+
+async def _contact_ids(client: httpx.AsyncClient):
+    ids, cursor = [], None
+    while True:
+        response = await client.get("/api/v1/contacts/", params={"limit": 1000, **({"cursor": cursor} if cursor else {})})
+        ids += [c["id"] for c in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids
+
+
+async def _hammer(client: httpx.AsyncClient, requests: int, campaign_id=None):
+    samples = []
+    paths = [path.format(campaign_id=campaign_id) for path in ENDPOINTS if campaign_id or "{" not in path]
+    counter = iter(range(requests))
+
+    async def user():
+        for i in counter:
+            start = time.perf_counter()
+            (await client.get(paths[i % len(paths)])).raise_for_status()
+            samples.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(user() for _ in range(CONCURRENCY)))
+    return samples
+
+
+async def _run(api_url: str, contacts: int, requests: int):
+    async with httpx.AsyncClient(base_url=api_url, timeout=60.0) as client:
+        batch = [
+            {"name": f"Bench {i}", "phone": f"1199{i:07d}", "category": "bench", "address": "Rua 1 - Centro, Campinas - SP"}
+            for i in range(contacts)
+        ]
+        inserted = (await client.post("/api/v1/contacts/", json=batch)).json()["inserted"]
+        template = (await client.post("/api/v1/templates/", json={"name": f"bench-{time.time_ns()}", "content": "Oi {nome}"})).json()
+        ids = await _contact_ids(client)
+
+        idle = await _hammer(client, requests)
+
+        campaign = (await client.post(
+            "/api/v1/campaigns/", json={"name": "bench", "template_id": template["id"], "contact_ids": ids}
+        )).json()
+        started = time.perf_counter()
+        busy = await _hammer(client, requests, campaign_id=campaign["id"])
+        stats = (await client.get(f"/api/v1/campaigns/{campaign['id']}/stats")).json()
+
+    print(f"{inserted} contacts, {requests} requests per phase, {CONCURRENCY} concurrent clients")
+    _report("idle", idle)
+    _report("campaign running", busy)
+    print(
+        f"campaign after {time.perf_counter() - started:.1f}s: status={stats['status']} "
+        f"sent={stats['sent']} skipped={stats['skipped']} pending={stats['pending']}"
+    )
+
+
+def main():
+    contacts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 1500
+    with BackgroundServer(evolution_app) as evolution:
+        _configure(evolution.url)
+        from app.main import app
+
+        with BackgroundServer(app) as api:
+            asyncio.run(_run(api.url, contacts, requests))
+
+
+if __name__ == "__main__":
+    main()
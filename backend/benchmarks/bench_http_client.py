@@ -0,0 +1,62 @@
+"""
+Per-send latency: a fresh httpx.AsyncClient per call (old behaviour)
+versus the shared pooled client from app/core/http.py.
+
+    cd backend && python -m benchmarks.bench_http_client [sends]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+from benchmarks.mock_servers import BackgroundServer, evolution_app
+from app.core.http import create_http_client
+
+PAYLOAD = {"number": "5511999999999", "textMessage": {"text": "Oi"}}
+
+
+def _report(label: str, samples):
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{label:<22} mean={statistics.mean(samples):7.2f} ms  p50={p50:7.2f} ms  p99={p99:7.2f} ms")
+
+
+async def fresh_client_per_send(url: str, sends: int):
+    samples = []
+    for _ in range(sends):
+        start = time.perf_counter()
+        async with httpx.AsyncClient() as client:
+            (await client.post(f"{url}/message/sendText/main", json=PAYLOAD)).raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def shared_client(url: str, sends: int):
+    samples = []
+    client = create_http_client(base_url=url, timeout=30.0)
+    try:
+        for _ in range(sends):
+            start = time.perf_counter()
+            (await client.post("/message/sendText/main", json=PAYLOAD)).raise_for_status()
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        await client.aclose()
+    return samples
+
+
+def main():
+    sends = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with BackgroundServer(evolution_app) as server:
+        fresh = asyncio.run(fresh_client_per_send(server.url, sends))
+        shared = asyncio.run(shared_client(server.url, sends))
+    print(f"{sends} sends against mock Evolution at {server.url}")
+    _report("fresh client per send", fresh)
+    _report("shared pooled client", shared)
+    print(f"mean gain per send: {statistics.mean(fresh) - statistics.mean(shared):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
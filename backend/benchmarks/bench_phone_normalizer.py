@@ -0,0 +1,72 @@
+"""
+Phone normalization: the original per-call normalize_phone loop versus
+the cached batch API (normalize_phones), which also validates DDD and
+mobile/landline prefixes.
+
+    cd backend && python -m benchmarks.bench_phone_normalizer [count]
+
+Numbers are drawn from a pool smaller than the count, like Apify results
+where the same places come back across overlapping searches.
+"""
+import random
+import re
+import sys
+import time
+from collections import Counter
+
+from app.utils.phone_normalizer import classify_phone, normalize_phones
+
+
+def legacy_normalize_phone(phone: str, default_country_code: str = "55") -> str:
+    # Original implementation (re.sub with an uncompiled pattern per call, no validation)
+    if not phone:
+        return ""
+    cleaned = re.sub(r'\D', '', phone)
+    if not cleaned:
+        return ""
+    if cleaned.startswith('0'):
+        cleaned = cleaned[1:]
+    if len(cleaned) in [10, 11]:
+        cleaned = default_country_code + cleaned
+    return cleaned
+
+
+def sample_numbers(count: int, pool_size: int) -> list:
+    rng = random.Random(42)
+    formats = [
+        lambda d, n: f"({d}) 9{n[:4]}-{n[4:]}",
+        lambda d, n: f"+55 {d} 9{n[:4]}-{n[4:]}",
+        lambda d, n: f"({d}) {rng.choice('2345')}{n[1:4]}-{n[4:]}",
+        lambda d, n: f"0{d} {n}",
+        lambda d, n: f"+1 415 {n[:3]} {n[3:7]}",
+    ]
+    pool = [
+        rng.choice(formats)(rng.choice(["11", "19", "21", "20", "47"]), f"{rng.randrange(10**8):08d}")
+        for _ in range(pool_size)
+    ]
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def timed(label: str, fn, numbers):
+    start = time.perf_counter()
+    result = fn(numbers)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed:6.2f} s  {len(numbers) / elapsed / 1e6:5.2f} M numbers/s")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    numbers = sample_numbers(count, pool_size=count // 5)
+    print(f"{count:,} numbers ({len(set(numbers)):,} distinct)")
+
+    timed("legacy normalize_phone loop", lambda ns: [legacy_normalize_phone(n) for n in ns], numbers)
+    classify_phone.cache_clear()
+    result = timed("normalize_phones (cold cache)", normalize_phones, numbers)
+    timed("normalize_phones (warm cache)", normalize_phones, numbers)
+
+    print("classification:", dict(Counter(info.type.value for info in result)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Rows per second served by the high-volume read endpoints.
+
+Seeds contacts, campaigns and campaign logs (100k rows each by default)
+straight through the engine, starts the API under uvicorn and reads each
+table completely: cursor pages of 1000 rows for contacts and logs, and
+whatever GET /campaigns returns per call. Each endpoint is read with
+every field and with a narrow `?fields=` selection.
+
+    cd backend && python -m benchmarks.bench_read_path [rows]
+
+Uses a throwaway SQLite database unless BENCH_DATABASE_URL is set.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.mock_servers import BackgroundServer
+
+PAGE_SIZE = 1000
+ENDPOINTS = [
+    ("contacts", "/api/v1/contacts/", "id,name,phone"),
+    ("campaigns", "/api/v1/campaigns/", "id,name,status"),
+    ("logs", "/api/v1/campaigns/logs", "id,status,sent_at"),
+]
+
+
+def _configure():
+    """Settings are read at import time, so this runs before the app is imported."""
+    database_url = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    os.environ.update(DATABASE_URL=database_url, METRICS_ENABLED="false")
+
+
+def _seed(rows: int):
+    from sqlalchemy import func, insert, select
+    from app.core.database import SessionLocal, init_db
+    from app.models.all_models import Campaign, CampaignLog, Contact, Template
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if db.execute(select(func.count(Contact.id))).scalar() >= rows:
+            return
+        template = Template(name=f"bench-{time.time_ns()}", content="Oi {nome}")
+        db.add(template)
+        db.flush()
+        chunk = 5000
+        for start in range(0, rows, chunk):
+            ids = range(start, min(start + chunk, rows))
+            db.execute(insert(Contact.__table__), [
+                {"name": f"Bench {i}", "phone": f"55199{i:08d}", "phone_type": "MOBILE", "status": "PENDING",
+                 "category": "bench", "address": "R. Barão de Jaguara, 1000 - Centro, Campinas - SP, 13015-001, Brasil",
+                 "google_maps_link": f"https://www.google.com/maps/search/?api=1&query=Bench&query_place_id=ChIJbench{i:010d}"}
+                for i in ids
+            ])
+            db.execute(insert(Campaign.__table__), [
+                {"name": f"Bench {i}", "template_id": template.id, "status": "COMPLETED"} for i in ids
+            ])
+        first_contact = db.execute(select(func.min(Contact.id))).scalar()
+        first_campaign = db.execute(select(func.min(Campaign.id))).scalar()
+        for start in range(0, rows, chunk):
+            db.execute(insert(CampaignLog.__table__), [
+                {"campaign_id": first_campaign + i % 100, "contact_id": first_contact + i, "status": "SENT"}
+                for i in range(start, min(start + chunk, rows))
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _read_all(client: httpx.AsyncClient, path: str, fields=None):
+    rows, requests, cursor = 0, 0, None
+    started = time.perf_counter()
+    while True:
+        params = {"limit": PAGE_SIZE}
+        if cursor:
+            params["cursor"] = cursor
+        if fields:
+            params["fields"] = fields
+        response = await client.get(path, params=params)
+        response.raise_for_status()
+        rows += len(response.json())
+        requests += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return rows, requests, time.perf_counter() - started
+
+
+async def _run(api_url: str):
+    async with httpx.AsyncClient(base_url=api_url, timeout=300.0) as client:
+        await _read_all(client, "/api/v1/contacts/") # warm up
+        print(f"{'endpoint':<10} {'fields':<18} {'rows':>7} {'requests':>8} {'seconds':>8} {'rows/s':>9}")
+        for name, path, narrow in ENDPOINTS:
+            for fields in (None, narrow):
+                rows, requests, seconds = await _read_all(client, path, fields)
+                print(f"{name:<10} {fields or 'all':<18} {rows:>7} {requests:>8} {seconds:>8.2f} {rows / seconds:>9.0f}")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    _configure()
+    _seed(rows)
+    from app.main import app
+
+    with BackgroundServer(app) as api:
+        asyncio.run(_run(api.url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Evolution webhook ingestion under a burst of events.
+
+Seeds contacts and sent campaign logs with WhatsApp message ids straight
+through the engine, starts the API under uvicorn and fires Evolution-shaped
+events at POST /api/v1/webhooks/evolution from concurrent clients: three
+receipts per message (SERVER_ACK, DELIVERY_ACK, READ, shuffled so some
+arrive out of order) plus a reply from every tenth contact. Reports the
+acknowledgement latency the way Evolution sees it, events per second and
+how long the buffer takes to get everything into the database.
+
+    cd backend && python -m benchmarks.bench_webhooks [messages] [concurrency]
+
+Uses a throwaway SQLite database unless BENCH_DATABASE_URL is set.
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.mock_servers import BackgroundServer
+
+RECEIPTS = ("SERVER_ACK", "DELIVERY_ACK", "READ")
+REPLY_EVERY = 10
+
+
+def _configure():
+    """Settings are read at import time, so this runs before the app is imported."""
+    database_url = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    os.environ.update(DATABASE_URL=database_url, METRICS_ENABLED="false", EVOLUTION_WEBHOOK_TOKEN="")
+
+
+def _seed(messages: int) -> int:
+    """Returns the id of the benchmark campaign."""
+    from sqlalchemy import insert, select
+    from app.core.database import SessionLocal, init_db
+    from app.models.all_models import Campaign, CampaignLog, Contact, Template
+
+    init_db()
+    db = SessionLocal()
+    try:
+        run = time.time_ns()
+        template = Template(name=f"bench-{run}", content="Oi {nome}")
+        db.add(template)
+        db.flush()
+        campaign = Campaign(name=f"bench-webhooks-{run}", template_id=template.id, status="COMPLETED")
+        db.add(campaign)
+        db.flush()
+        chunk = 5000
+        for start in range(0, messages, chunk):
+            ids = range(start, min(start + chunk, messages))
+            db.execute(insert(Contact.__table__), [
+                {"name": f"Bench {i}", "phone": _phone(run, i), "phone_type": "MOBILE", "status": "SENT"} for i in ids
+            ])
+            contact_ids = dict(db.execute(
+                select(Contact.phone, Contact.id).where(Contact.phone.in_([_phone(run, i) for i in ids]))
+            ).all())
+            db.execute(insert(CampaignLog.__table__), [
+                {"campaign_id": campaign.id, "contact_id": contact_ids[_phone(run, i)], "status": "SENT",
+                 "message_id": _message_id(campaign.id, i)}
+                for i in ids
+            ])
+        db.commit()
+        return campaign.id
+    finally:
+        db.close()
+
+
+def _phone(run: int, i: int) -> str:
+    return f"55199{(run // 1000 + i) % 10 ** 8:08d}"
+
+
+def _message_id(campaign_id: int, i: int) -> str:
+    return f"BENCH{campaign_id:06d}{i:09d}"
+
+
+def _events(campaign_id: int, messages: int, phones) -> list:
+    events = [
+        {"event": "messages.update", "instance": "main",
+         "data": {"keyId": _message_id(campaign_id, i), "fromMe": True, "status": status}}
+        for i in range(messages) for status in RECEIPTS
+    ]
+    events += [
+        {"event": "messages.upsert", "instance": "main",
+         "data": {"key": {"remoteJid": f"{phones[i]}@s.whatsapp.net", "fromMe": False, "id": f"IN{i}"},
+                  "message": {"conversation": "Oi, tenho interesse"}}}
+        for i in range(0, messages, REPLY_EVERY)
+    ]
+    random.shuffle(events)
+    return events
+
+
+def _percentile(samples, q: float) -> float:
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * q) - 1)]
+
+
+def _written(campaign_id: int):
+    """(logs read, logs replied) for the campaign, straight from the database."""
+    from sqlalchemy import func, select
+    from app.core.database import SessionLocal
+    from app.models.all_models import CampaignLog
+
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(func.count(CampaignLog.read_at), func.count(CampaignLog.replied_at))
+            .where(CampaignLog.campaign_id == campaign_id)
+        ).one()
+    finally:
+        db.close()
+
+
+async def _post_all(api_url: str, events: list, concurrency: int):
+    latencies, errors = [], 0
+    queue = iter(events)
+
+    async def client_loop(client: httpx.AsyncClient):
+        nonlocal errors
+        for event in queue:
+            started = time.perf_counter()
+            response = await client.post("/api/v1/webhooks/evolution", json=event)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    async with httpx.AsyncClient(base_url=api_url, timeout=60.0) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    _configure()
+    campaign_id = _seed(messages)
+    from sqlalchemy import select
+    from app.core.database import SessionLocal
+    from app.main import app
+    from app.models.all_models import CampaignLog, Contact
+
+    db = SessionLocal()
+    try:
+        phones = [phone for phone, in db.execute(
+            select(Contact.phone).join(CampaignLog, CampaignLog.contact_id == Contact.id)
+            .where(CampaignLog.campaign_id == campaign_id).order_by(CampaignLog.id)
+        )]
+    finally:
+        db.close()
+    events = _events(campaign_id, messages, phones)
+    expected = (messages, len(range(0, messages, REPLY_EVERY)))
+
+    with BackgroundServer(app) as api:
+        started = time.perf_counter()
+        latencies, errors = asyncio.run(_post_all(api.url, events, concurrency))
+        posted = time.perf_counter() - started
+        while tuple(_written(campaign_id)) != expected and time.perf_counter() - started < posted + 120:
+            time.sleep(0.1)
+        drained = time.perf_counter() - started
+        written = tuple(_written(campaign_id))
+
+    print(f"events: {len(events)} ({messages} messages x {len(RECEIPTS)} receipts + {expected[1]} replies), {concurrency} clients")
+    print(f"acknowledged in {posted:.2f}s: {len(events) / posted:.0f} events/s, {len(events) / posted * 60:.0f}/min, {errors} errors")
+    print(f"ack latency ms: p50 {_percentile(latencies, 0.5):.1f}  p95 {_percentile(latencies, 0.95):.1f}  p99 {_percentile(latencies, 0.99):.1f}  max {max(latencies):.1f}")
+    print(f"in the database after {drained:.2f}s (lag {drained - posted:.2f}s): read {written[0]}/{expected[0]}, replied {written[1]}/{expected[1]}")
+
+
+if __name__ == "__main__":
+    main()
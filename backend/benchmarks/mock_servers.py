@@ -0,0 +1,193 @@
+"""
+Local stand-ins for the external services, used by the benchmark scripts.
+
+    uvicorn benchmarks.mock_servers:evolution_app --port 8081
+    uvicorn benchmarks.mock_servers:apify_app --port 8082
+
+Latency and failure rates come from MOCK_* environment variables and can
+be changed at runtime through `mock_config` when the servers run in-process.
+"""
+import asyncio
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+# Artificial processing time of every mocked call, in milliseconds
+MOCK_LATENCY_MS = float(os.getenv("MOCK_LATENCY_MS", "5"))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+@dataclass
+class MockConfig:
+    evolution_latency_ms: float = _env_float("MOCK_EVOLUTION_LATENCY_MS", MOCK_LATENCY_MS)
+    evolution_error_rate: float = _env_float("MOCK_EVOLUTION_ERROR_RATE", 0.0) # share of sendText calls answered with a 500
+    evolution_connected: bool = os.getenv("MOCK_EVOLUTION_CONNECTED", "true").lower() == "true"
+    not_on_whatsapp_ratio: float = _env_float("MOCK_NOT_ON_WHATSAPP_RATIO", 0.2) # share of numbers reported as not registered
+    apify_latency_ms: float = _env_float("MOCK_APIFY_LATENCY_MS", MOCK_LATENCY_MS)
+    apify_error_rate: float = _env_float("MOCK_APIFY_ERROR_RATE", 0.0) # share of Apify calls answered with a 500
+    apify_items_per_second: float = _env_float("MOCK_APIFY_ITEMS_PER_SECOND", 200) # how fast fake runs "scrape"
+    apify_run_failure_rate: float = _env_float("MOCK_APIFY_RUN_FAILURE_RATE", 0.0) # share of runs that end FAILED
+
+
+mock_config = MockConfig()
+
+_FAILURE = JSONResponse({"error": {"type": "mock-failure", "message": "Injected failure"}}, status_code=500)
+
+
+async def _simulate_latency(latency_ms: float):
+    if latency_ms > 0:
+        await asyncio.sleep(latency_ms / 1000)
+
+
+def _fails(error_rate: float) -> bool:
+    return error_rate > 0 and random.random() < error_rate
+
+
+evolution_app = FastAPI(title="Mock Evolution API")
+
+
+@evolution_app.post("/message/sendText/{instance}")
+async def send_text(instance: str, payload: dict):
+    await _simulate_latency(mock_config.evolution_latency_ms)
+    if not mock_config.evolution_connected:
+        return JSONResponse({"status": 400, "response": {"message": ["Connection Closed"]}}, status_code=400)
+    if _fails(mock_config.evolution_error_rate):
+        return _FAILURE
+    return {
+        "key": {"remoteJid": f"{payload.get('number')}@s.whatsapp.net", "fromMe": True, "id": f"MOCK{time.time_ns()}"},
+        "status": "PENDING",
+    }
+
+
+@evolution_app.post("/chat/whatsappNumbers/{instance}")
+async def whatsapp_numbers(instance: str, payload: dict):
+    await _simulate_latency(mock_config.evolution_latency_ms)
+    answers = []
+    for number in payload.get("numbers", []):
+        exists = zlib.crc32(number.encode()) % 1000 >= mock_config.not_on_whatsapp_ratio * 1000
+        answers.append({"exists": exists, "jid": f"{number}@s.whatsapp.net", "number": number})
+    return answers
+
+
+@evolution_app.get("/instance/connectionState/{instance}")
+async def connection_state(instance: str):
+    await _simulate_latency(mock_config.evolution_latency_ms)
+    state = "open" if mock_config.evolution_connected else "close"
+    return {"instance": {"instanceName": instance, "state": state}}
+
+
+apify_app = FastAPI(title="Mock Apify API")
+
+# Fake actor runs: items "appear" in the dataset over time, like a real scrape
+_apify_runs = {}
+
+
+def fake_place(query: str, index: int) -> dict:
+    term, _, location = query.partition(" in ")
+    return {
+        "title": f"{term.title()} {index}",
+        "phoneUnformatted": f"+55 19 9{index:08d}"[:19],
+        "address": f"Rua {index}, {index} - Centro, {location or 'Campinas'} - SP, 13010-000, Brasil",
+        "categoryName": term,
+        "url": f"https://www.google.com/maps/search/?api=1&query=x&query_place_id=ChIJmock{zlib.crc32(query.encode()) % 10**6}x{index}",
+        "searchString": query,
+    }
+
+
+def _run_items(run: dict) -> list:
+    elapsed = time.monotonic() - run["started"]
+    available = min(run["total"], int(elapsed * mock_config.apify_items_per_second))
+    return run["items"][:available]
+
+
+def _run_status(run: dict) -> str:
+    if len(_run_items(run)) < run["total"]:
+        return "RUNNING"
+    return "FAILED" if run["fails"] else "SUCCEEDED"
+
+
+def _run_data(run_id: str) -> dict:
+    run = _apify_runs[run_id]
+    return {"data": {"id": run_id, "defaultDatasetId": run_id, "status": _run_status(run)}}
+
+
+@apify_app.post("/acts/{actor_id}/runs")
+async def start_actor_run(actor_id: str, payload: dict):
+    await _simulate_latency(mock_config.apify_latency_ms)
+    if _fails(mock_config.apify_error_rate):
+        return _FAILURE
+    queries = payload.get("searchStringsArray", [])
+    # Like the actor: maxCrawledPlacesPerSearch caps each search string, maxCrawledPlaces the whole run
+    per_query = int(payload.get("maxCrawledPlacesPerSearch") or 50)
+    items = [fake_place(q, qi * per_query + i) for qi, q in enumerate(queries) for i in range(per_query)]
+    if payload.get("maxCrawledPlaces"):
+        items = items[:int(payload["maxCrawledPlaces"])]
+    run_id = uuid.uuid4().hex
+    _apify_runs[run_id] = {
+        "items": items, "total": len(items), "started": time.monotonic(), "fails": _fails(mock_config.apify_run_failure_rate)
+    }
+    return _run_data(run_id)
+
+
+@apify_app.get("/actor-runs/{run_id}")
+async def get_actor_run(run_id: str):
+    await _simulate_latency(mock_config.apify_latency_ms)
+    if _fails(mock_config.apify_error_rate):
+        return _FAILURE
+    return _run_data(run_id)
+
+
+@apify_app.post("/actor-runs/{run_id}/abort")
+async def abort_actor_run(run_id: str):
+    _apify_runs[run_id]["total"] = len(_run_items(_apify_runs[run_id]))
+    return _run_data(run_id)
+
+
+@apify_app.get("/datasets/{dataset_id}/items")
+async def get_dataset_items(dataset_id: str, offset: int = 0, limit: int = 1000):
+    await _simulate_latency(mock_config.apify_latency_ms)
+    if _fails(mock_config.apify_error_rate):
+        return _FAILURE
+    return _run_items(_apify_runs[dataset_id])[offset:offset + limit]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """Runs an ASGI app with uvicorn in a daemon thread (context manager)."""
+
+    def __init__(self, app, port: Optional[int] = None):
+        self.port = port or free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
@@ -0,0 +1,46 @@
+"""
+Test settings. Settings are read at import time, so the environment is set
+here before anything under app/ is imported: a throwaway SQLite database,
+no metrics, no embedded worker and fast Apify polling.
+
+    cd backend && pip install -r requirements-dev.txt && python -m pytest
+"""
+import os
+import tempfile
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/test.db",
+    METRICS_ENABLED="false",
+    CAMPAIGN_WORKER_EMBEDDED="false",
+    APIFY_API_URL="http://apify.test",
+    APIFY_API_KEY="test",
+    APIFY_POLL_INTERVAL="0.01",
+    APIFY_RETRY_BASE_SECONDS="0.01",
+)
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from benchmarks.mock_servers import apify_app, mock_config  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def fake_apify(monkeypatch):
+    """The mock Apify API from benchmarks/, instant and without failures unless a test says otherwise."""
+    monkeypatch.setattr(mock_config, "apify_latency_ms", 0)
+    monkeypatch.setattr(mock_config, "apify_error_rate", 0.0)
+    monkeypatch.setattr(mock_config, "apify_run_failure_rate", 0.0)
+    monkeypatch.setattr(mock_config, "apify_items_per_second", 100_000)
+    return mock_config
+
+
+@pytest.fixture
+async def apify_client(fake_apify):
+    """httpx client talking to the mock Apify app in-process (no sockets)."""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=apify_app), base_url="http://apify.test") as client:
+        yield client
@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+from app.services import apify_service as apify_module
+from app.services.apify_service import ApifyRunError, ApifyService, build_shards, normalize_item
+from benchmarks.mock_servers import _apify_runs, fake_place
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def service(apify_client, monkeypatch):
+    monkeypatch.setattr(apify_module.settings, "APIFY_DATASET_PAGE_SIZE", 7)
+    return ApifyService(client=apify_client)
+
+
+def _spy_pages(service, monkeypatch) -> list:
+    """Records the offset of every dataset page read."""
+    offsets = []
+    read_page = service.get_dataset_page
+
+    async def get_dataset_page(dataset_id, offset, limit):
+        offsets.append(offset)
+        return await read_page(dataset_id, offset, limit)
+
+    monkeypatch.setattr(service, "get_dataset_page", get_dataset_page)
+    return offsets
+
+
+async def test_iter_run_items_pages_through_the_whole_dataset(service, monkeypatch):
+    offsets = _spy_pages(service, monkeypatch)
+    run = await service.start_run(["bar in Campinas"], 20)
+
+    items = [item async for item in service.iter_run_items(run)]
+
+    assert [item["title"] for item in items] == [fake_place("bar in Campinas", i)["title"] for i in range(20)]
+    assert offsets[:3] == [0, 7, 14]
+    assert offsets == sorted(offsets)
+
+
+async def test_iter_run_items_streams_while_the_run_is_still_scraping(service, fake_apify, monkeypatch):
+    fake_apify.apify_items_per_second = 200
+    offsets = _spy_pages(service, monkeypatch)
+    run = await service.start_run(["bar in Campinas"], 30)
+    assert run["status"] == "RUNNING"
+
+    items = [item async for item in service.iter_run_items(run)]
+
+    assert len(items) == 30
+    assert len({item["url"] for item in items}) == 30
+    assert len(offsets) > 5 # polled while the dataset was filling
+
+
+async def test_iter_run_items_raises_when_the_run_fails(service, fake_apify):
+    fake_apify.apify_run_failure_rate = 1.0
+    run = await service.start_run(["bar in Campinas"], 10)
+
+    with pytest.raises(ApifyRunError, match="FAILED"):
+        async for _ in service.iter_run_items(run):
+            pass
+
+
+async def test_iter_run_items_aborts_a_run_past_the_timeout(service, fake_apify, monkeypatch):
+    fake_apify.apify_items_per_second = 50
+    monkeypatch.setattr(apify_module.settings, "APIFY_RUN_TIMEOUT", 0.05)
+    run = await service.start_run(["bar in Campinas"], 1000)
+
+    read = []
+    with pytest.raises(ApifyRunError, match="aborted"):
+        async for item in service.iter_run_items(run):
+            read.append(item)
+
+    assert 0 < _apify_runs[run["id"]]["total"] < 1000
+
+
+async def test_start_run_caps_places_per_search_string(service):
+    run = await service.start_run(["bar in Campinas", "pizza in Campinas"], 5)
+
+    items = [item async for item in service.iter_run_items(run)]
+
+    assert sorted(item["searchString"] for item in items) == ["bar in Campinas"] * 5 + ["pizza in Campinas"] * 5
+
+
+async def test_stream_shards_tags_contacts_with_their_query(service, monkeypatch):
+    monkeypatch.setattr(apify_module.settings, "APIFY_SHARD_SIZE", 2)
+    queries = ["bar in Campinas", "pizza in Campinas", "bar in Sumaré"]
+    progress = {}
+
+    results = [entry async for entry in service.stream_shards(queries, 3, progress)]
+
+    assert sorted(query for query, _ in results) == sorted(queries * 3)
+    assert progress["shards"] == progress["shards_done"] == 2
+    assert progress["failed_queries"] == progress["untagged_queries"] == []
+
+
+async def test_stream_shards_carries_on_without_a_failed_shard(service, monkeypatch):
+    monkeypatch.setattr(apify_module.settings, "APIFY_SHARD_SIZE", 1)
+    start_run = service.start_run
+
+    async def refuse_sumare(queries, limit):
+        if "bar in Sumaré" in queries:
+            raise ApifyRunError("refused")
+        return await start_run(queries, limit)
+
+    monkeypatch.setattr(service, "start_run", refuse_sumare)
+    progress = {}
+
+    results = [entry async for entry in service.stream_shards(["bar in Campinas", "bar in Sumaré"], 4, progress)]
+
+    assert {query for query, _ in results} == {"bar in Campinas"}
+    assert progress["shards_failed"] == 1
+    assert progress["failed_queries"] == ["bar in Sumaré"]
+
+
+async def test_stream_shards_raises_when_every_shard_failed(service, fake_apify):
+    fake_apify.apify_run_failure_rate = 1.0
+    progress = {}
+
+    with pytest.raises(ApifyRunError, match="All 2 Apify runs failed"):
+        async for _ in service.stream_shards(["bar in Campinas", "bar in Sumaré"], 4, progress):
+            pass
+    assert sorted(progress["failed_queries"]) == ["bar in Campinas", "bar in Sumaré"]
+
+
+async def test_stream_shards_aborts_runs_when_the_consumer_stops(service, fake_apify):
+    fake_apify.apify_items_per_second = 20
+    stream = service.stream_shards(["bar in Campinas"], 500)
+
+    await stream.__anext__()
+    await stream.aclose()
+    await asyncio.sleep(0.05)
+
+    run = list(_apify_runs.values())[-1]
+    assert run["total"] < 500
+
+
+def test_build_shards_groups_queries_by_location():
+    queries = ["a in X", "b in X", "c in X", "a in Y"]
+
+    assert build_shards(queries, 2) == [["a in X", "b in X"], ["c in X"], ["a in Y"]]
+    assert build_shards(queries, 0) == [["a in X", "b in X", "c in X"], ["a in Y"]]
+
+
+def test_normalize_item_skips_places_without_a_valid_phone():
+    place = fake_place("bar in Campinas", 1)
+
+    assert normalize_item(place).phone
+    assert normalize_item({**place, "phoneUnformatted": None, "phone": None}) is None
+    assert normalize_item({**place, "phoneUnformatted": "123"}) is None
@@ -0,0 +1,47 @@
+from app.utils.dedupe import DedupeIndex, extract_place_id, name_address_key
+
+
+def test_extract_place_id_from_search_links():
+    link = "https://www.google.com/maps/search/?api=1&query=Bar&query_place_id=ChIJN1t_tDeuEmsRUsoyG83frY4"
+
+    assert extract_place_id(link) == "ChIJN1t_tDeuEmsRUsoyG83frY4"
+
+
+def test_extract_place_id_from_place_links():
+    assert extract_place_id(
+        "https://www.google.com/maps/place/Bar/@-22.9,-47.06,17z/data=!4m6!3m5!1s0x94c8c8f3:0x1a2b!8m2!3d-22.9!4d-47.06"
+        "!16s%2Fg%2F11x!19sChIJN1t_tDeuEmsRUsoyG83frY4"
+    ) == "ChIJN1t_tDeuEmsRUsoyG83frY4"
+    # No place id: the CID from the feature id, or from ?cid=
+    assert extract_place_id("https://www.google.com/maps/place/Bar/data=!3m1!1s0x94c8c8f3:0x1a2b") == f"cid:{0x1a2b}"
+    assert extract_place_id("https://maps.google.com/?cid=123456789") == "cid:123456789"
+
+
+def test_extract_place_id_without_an_id():
+    assert extract_place_id(None) is None
+    assert extract_place_id("") is None
+    assert extract_place_id("https://www.google.com/maps/search/bar+campinas") is None
+
+
+def test_name_address_key_ignores_spelling_noise():
+    key = name_address_key("Padaria São José Ltda", "R. Barão de Jaguara, 1000 - Centro, Campinas - SP, 13015-002, Brasil")
+
+    assert key == name_address_key("PADARIA SAO JOSE", "Rua Barao de Jaguara 1000, Centro, Campinas - SP")
+    assert key != name_address_key("Padaria São José", "Rua Barão de Jaguara, 1200 - Centro, Campinas - SP")
+
+
+def test_name_address_key_needs_both_parts():
+    assert name_address_key("Padaria São José", None) is None
+    assert name_address_key(None, "Rua Barão de Jaguara, 1000") is None
+    assert name_address_key("Ltda", "Rua Barão de Jaguara, 1000") is None
+
+
+def test_dedupe_index_collapses_a_place_seen_under_different_keys():
+    seen = DedupeIndex()
+    link = "https://www.google.com/maps/search/?api=1&query=x&query_place_id=ChIJN1t_tDeuEmsRUsoyG83frY4"
+
+    assert seen.add_contact("5519999990001", "Bar do Zé", "Rua A, 1 - Campinas", link)
+    assert not seen.add_contact("5519999990002", "Bar do Zé", "Rua A, 1 - Campinas", None) # same name + address
+    assert not seen.add_contact("5519999990003", "Outro nome", "Outro lugar", link) # same place id
+    assert not seen.add_contact("5519999990002", None, None, None) # phone seen with the second one
+    assert seen.add_contact("5519999990004", "Bar do Zé", "Rua B, 2 - Campinas", None)
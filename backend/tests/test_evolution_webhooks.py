@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+
+from app.models.all_models import DeliveryStatus
+from app.services.evolution_webhooks import MESSAGES_UPDATE, MESSAGES_UPSERT, jid_phones, parse_webhook
+
+NOW = datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc)
+
+
+def test_delivery_receipt_v1_shape():
+    name, deliveries, replies = parse_webhook(
+        {"event": "messages.update", "data": {"keyId": "ABC", "fromMe": True, "status": "DELIVERY_ACK"}}, NOW
+    )
+
+    assert name == MESSAGES_UPDATE
+    assert [(d.message_id, d.status, d.received_at) for d in deliveries] == [("ABC", DeliveryStatus.DELIVERY_ACK, NOW)]
+    assert replies == []
+
+
+def test_delivery_receipts_v2_shape_and_numeric_acks():
+    _, deliveries, _ = parse_webhook({"event": "MESSAGES_UPDATE", "data": [
+        {"key": {"id": "A", "fromMe": True}, "update": {"status": 4}},
+        {"key": {"id": "B", "fromMe": True}, "update": {"status": "3"}},
+        {"key": {"id": "C", "fromMe": False}, "update": {"status": "READ"}}, # the lead's own message
+        {"key": {"id": "D", "fromMe": True}, "update": {"status": "ERROR"}},
+        "not a record",
+    ]}, NOW)
+
+    assert [(d.message_id, d.status) for d in deliveries] == [("A", DeliveryStatus.READ), ("B", DeliveryStatus.DELIVERY_ACK)]
+
+
+def test_reply_gives_the_sender_phones():
+    name, deliveries, replies = parse_webhook({"event": "messages-upsert", "data": {
+        "key": {"remoteJid": "551998765432@s.whatsapp.net", "fromMe": False, "id": "IN1"},
+        "message": {"conversation": "Oi"},
+    }}, NOW)
+
+    assert name == MESSAGES_UPSERT
+    assert deliveries == []
+    assert [(r.phones, r.received_at) for r in replies] == [(("551998765432", "5519998765432"), NOW)]
+
+
+def test_own_messages_groups_and_other_events_are_ignored():
+    upsert = {"event": "messages.upsert", "data": [
+        {"key": {"remoteJid": "5519998765432@s.whatsapp.net", "fromMe": True}},
+        {"key": {"remoteJid": "120363025246125888@g.us", "fromMe": False}},
+        {"key": {"remoteJid": "5519998765432@broadcast", "fromMe": False}},
+    ]}
+
+    assert parse_webhook(upsert, NOW) == ("messages.upsert", [], [])
+    assert parse_webhook({"event": "connection.update", "data": {"state": "open"}}, NOW) == ("connection.update", [], [])
+    assert parse_webhook(["not", "a", "dict"], NOW) == ("", [], [])
+
+
+def test_jid_phones():
+    assert jid_phones("5519998765432@s.whatsapp.net") == ("5519998765432",)
+    assert jid_phones("5519998765432:12@s.whatsapp.net") == ("5519998765432",)
+    assert jid_phones("1234@lid") == ()
+    assert jid_phones(None) == ()
@@ -0,0 +1,55 @@
+from collections import Counter
+
+from app.services.campaign_queue import FairShare
+
+
+def _campaigns(chosen, owners) -> Counter:
+    return Counter(owners[recipient_id] for recipient_id in chosen)
+
+
+def test_split_follows_the_weights():
+    candidates = {1: list(range(100, 200)), 2: list(range(200, 300))}
+    owners = {r: c for c, ids in candidates.items() for r in ids}
+
+    chosen = FairShare().split(candidates, {1: 2, 2: 1}, 30)
+
+    assert len(chosen) == 30
+    assert _campaigns(chosen, owners) == {1: 20, 2: 10}
+
+
+def test_split_keeps_queue_order_within_a_campaign():
+    chosen = FairShare().split({1: [5, 3, 9], 2: [1, 2]}, {}, 10)
+
+    assert [r for r in chosen if r in (5, 3, 9)] == [5, 3, 9]
+    assert sorted(chosen) == [1, 2, 3, 5, 9]
+
+
+def test_small_campaign_gives_its_share_to_the_others():
+    chosen = FairShare().split({1: [1], 2: list(range(10, 20)), 3: []}, {1: 1, 2: 1, 3: 1}, 6)
+
+    assert chosen == [1, 10, 11, 12, 13, 14]
+
+
+def test_share_carries_over_between_claims():
+    share = FairShare()
+    owners = {}
+    totals = Counter()
+    for claim in range(10):
+        candidates = {c: [c * 1000 + claim * 10 + i for i in range(10)] for c in (1, 2, 3)}
+        owners.update({r: c for c, ids in candidates.items() for r in ids})
+        # Claims of 2 with three equal campaigns: nobody gets skipped for long
+        totals += _campaigns(share.split(candidates, {}, 2), owners)
+
+    assert sorted(totals.values()) == [6, 7, 7]
+
+
+def test_joining_campaign_starts_at_the_current_minimum():
+    share = FairShare()
+    for _ in range(50):
+        share.split({1: list(range(10))}, {}, 10)
+
+    owners = {r: 1 for r in range(10)} | {r: 2 for r in range(100, 110)}
+    chosen = share.split({1: list(range(10)), 2: list(range(100, 110))}, {}, 10)
+
+    # Neither starved by campaign 1's history nor handed 10 in a row to catch up
+    assert _campaigns(chosen, owners) == {1: 5, 2: 5}
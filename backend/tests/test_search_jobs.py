@@ -0,0 +1,74 @@
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import SessionLocal
+from app.main import app
+from app.services.apify_service import apify_service
+from app.services.search_cache import search_cache
+from benchmarks.mock_servers import apify_app
+
+
+@pytest.fixture
+def client(fake_apify):
+    with TestClient(app) as client:
+        # Lifespan bound a real client; talk to the mock instead
+        apify_service.bind_client(httpx.AsyncClient(transport=httpx.ASGITransport(app=apify_app), base_url="http://apify.test"))
+        db = SessionLocal()
+        try:
+            search_cache.clear(db)
+        finally:
+            db.close()
+        yield client
+
+
+def _wait(client, job_id: str) -> dict:
+    deadline = time.monotonic() + 10
+    while True:
+        job = client.get(f"/api/v1/search/jobs/{job_id}", params={"limit": 1000}).json()
+        if job["status"] in ("SUCCEEDED", "FAILED") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+def test_search_job_collects_results_and_caches_them(client):
+    request = {"terms": ["bar", "pizza"], "locations": ["Campinas"], "limit": 5}
+
+    created = client.post("/api/v1/search/jobs", json=request)
+    assert created.status_code == 202
+    job = _wait(client, created.json()["id"])
+
+    assert job["status"] == "SUCCEEDED"
+    assert job["total"] == len(job["items"]) > 0
+    assert job["progress"]["queries"] == 2
+    assert job["progress"]["shards_failed"] == 0
+
+    again = _wait(client, client.post("/api/v1/search/jobs", json=request).json()["id"])
+    assert again["progress"]["cached"] == 2
+    assert [item["phone"] for item in again["items"]] == [item["phone"] for item in job["items"]]
+
+
+def test_search_job_stream_follows_the_job(client, fake_apify):
+    fake_apify.apify_items_per_second = 200
+    job_id = client.post("/api/v1/search/jobs", json={"terms": ["bar"], "locations": ["Sumaré"], "limit": 20}).json()["id"]
+
+    with client.stream("GET", f"/api/v1/search/jobs/{job_id}/stream") as response:
+        lines = [line for line in response.iter_lines() if line]
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert len(lines) == _wait(client, job_id)["total"] > 0
+
+
+def test_search_job_fails_when_every_run_failed(client, fake_apify):
+    fake_apify.apify_run_failure_rate = 1.0
+
+    job = _wait(client, client.post("/api/v1/search/jobs", json={"terms": ["bar"], "locations": ["Paulínia"], "limit": 5}).json()["id"])
+
+    assert job["status"] == "FAILED"
+    assert "failed" in job["error"]
+
+
+def test_unknown_search_job_is_404(client):
+    assert client.get("/api/v1/search/jobs/nope").status_code == 404
@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.utils.send_window import in_send_window, validate_weekdays, validate_window
+
+SAO_PAULO = "America/Sao_Paulo" # UTC-3, no daylight saving
+
+
+def _at(day: int, hour: int, minute: int = 0) -> datetime:
+    """São Paulo local time in the week of Monday 2026-03-02 (day 0 = Monday)."""
+    return datetime(2026, 3, 2 + day, hour, minute, tzinfo=ZoneInfo(SAO_PAULO))
+
+
+def test_inside_and_outside_a_daytime_window():
+    assert in_send_window(_at(0, 8), "08:00-20:00", "", SAO_PAULO)
+    assert in_send_window(_at(0, 19, 59), "08:00-20:00", "", SAO_PAULO)
+    assert not in_send_window(_at(0, 7, 59), "08:00-20:00", "", SAO_PAULO)
+    assert not in_send_window(_at(0, 20), "08:00-20:00", "", SAO_PAULO) # end is exclusive
+
+
+def test_window_is_evaluated_in_the_campaign_time_zone():
+    noon_utc = datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc) # 09:00 in São Paulo
+
+    assert in_send_window(noon_utc, "08:00-10:00", "", SAO_PAULO)
+    assert not in_send_window(noon_utc, "08:00-10:00", "", "UTC")
+
+
+def test_window_wrapping_past_midnight_belongs_to_the_day_it_started():
+    friday, saturday = 4, 5
+
+    assert in_send_window(_at(friday, 23), "22:00-02:00", "fri", SAO_PAULO)
+    assert in_send_window(_at(saturday, 1), "22:00-02:00", "fri", SAO_PAULO)
+    assert not in_send_window(_at(friday, 1), "22:00-02:00", "fri", SAO_PAULO) # Thursday's window
+    assert not in_send_window(_at(saturday, 2), "22:00-02:00", "fri", SAO_PAULO)
+    assert not in_send_window(_at(saturday, 12), "22:00-02:00", "fri", SAO_PAULO)
+
+
+def test_weekdays_in_english_and_portuguese():
+    monday, saturday = 0, 5
+
+    assert in_send_window(_at(monday, 10), None, "mon,tue", SAO_PAULO)
+    assert not in_send_window(_at(saturday, 10), None, "mon,tue", SAO_PAULO)
+    assert in_send_window(_at(saturday, 10), "08:00-20:00", "seg,sáb", SAO_PAULO)
+    assert in_send_window(_at(saturday, 10), "08:00-20:00", "Segunda, Sábado", SAO_PAULO)
+
+
+def test_empty_window_and_weekdays_mean_no_restriction():
+    assert in_send_window(_at(6, 3), None, "", SAO_PAULO)
+
+
+@pytest.mark.parametrize("window", ["8:00-20:00", "08:00-24:00", "08:00", "ontem"])
+def test_validate_window_rejects_bad_values(window):
+    with pytest.raises(ValueError):
+        validate_window(window)
+
+
+def test_validate_weekdays_rejects_unknown_names():
+    assert validate_weekdays(" seg,ter,qua ") == "seg,ter,qua"
+    with pytest.raises(ValueError, match="funday"):
+        validate_weekdays("mon,funday")
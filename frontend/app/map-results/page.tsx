@@ -168,7 +168,7 @@ export default function CrawlerResultsPage() {
       return res.data;
     },
     onSuccess: (data) => {
-      toast.success(`Saved ${data.length} contacts for Campaign`);
+      toast.success(`Saved ${data.inserted} contacts for Campaign (${data.skipped} skipped)`);
       setSelected(new Set());
     },
     onError: () => {
@@ -59,7 +59,7 @@ export default function SearchPage() {
       return res.data;
     },
     onSuccess: (data) => {
-      toast.success(`Saved ${data.length} contacts`);
+      toast.success(`Saved ${data.inserted} contacts (${data.skipped} skipped)`);
       // Optionally clear results or mark as saved
     },
     onError: () => {